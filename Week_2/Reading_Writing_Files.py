@@ -1,5 +1,62 @@
+import argparse
+import atexit
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import heapq
+import json
 import os
+import select
 import shutil
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; reflinks are skipped there
+    fcntl = None
+
+# Name of the manifest kept in the destination folder to make reruns incremental
+MANIFEST_NAME = ".copy_manifest.json"
+
+# Files larger than this are copied in chunks with progress reports instead of with shutil.copy2
+LARGE_FILE_THRESHOLD = 1e9  # 1 GB
+LARGE_FILE_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Assumed throughput for dry-run estimates; override with --rate and --per-file-ms
+PLAN_MEGABYTES_PER_SECOND = 100.0
+PLAN_SECONDS_PER_FILE = 0.002
+
+# inotify constants from <sys/inotify.h>
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# Watch mode waits for this many quiet seconds before syncing, but never more than
+# WATCH_MAX_DELAY_FACTOR times that while changes keep arriving
+WATCH_DEBOUNCE_SECONDS = 1.0
+WATCH_MAX_DELAY_FACTOR = 5
+
+# ioctl request that clones a file's data as a copy-on-write reflink (Linux, e.g. btrfs and XFS)
+FICLONE = 0x40049409
+
+# Errors that mean a kernel-side copy is not possible between two files, rather than a failed copy
+KERNEL_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
 
 def create_destination_folder(destination: str):
     """Create the destination folder if it doesn't exist.
@@ -11,57 +68,1066 @@ def create_destination_folder(destination: str):
         os.makedirs(destination)
         log_action(f"Folder created: {destination}")
 
-def copy_files(source: str, destination: str):
+def load_manifest(destination: str) -> dict:
+    """Load the copy manifest from the destination folder.
+
+    Args:
+        destination (str): The path to the destination folder.
+
+    Returns:
+        dict: Relative file path -> {"size", "mtime_ns", "hash"}; empty if there is no manifest.
+    """
+    manifest_path = os.path.join(destination, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        log_action(f"Ignoring unreadable manifest {manifest_path}: {str(e)}")
+        return {}
+
+def save_manifest(destination: str, manifest: dict):
+    """Write the copy manifest to the destination folder.
+
+    The manifest is written to a temporary file first and then moved into place,
+    so an interrupted run never leaves a half-written manifest behind.
+
+    Args:
+        destination (str): The path to the destination folder.
+        manifest (dict): The manifest to save.
+    """
+    manifest_path = os.path.join(destination, MANIFEST_NAME)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(temp_path, manifest_path)
+
+def file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 of a file without loading it into memory.
+
+    Args:
+        path (str): The path to the file.
+        chunk_size (int): The number of bytes read at a time.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_unchanged(entry: dict, stat: os.stat_result, source_file: str, destination_file: str, use_hash: bool) -> bool:
+    """Check a source file against its manifest entry.
+
+    Args:
+        entry (dict): The manifest entry for the file, or None.
+        stat (os.stat_result): The stat of the source file.
+        source_file (str): The path to the source file.
+        destination_file (str): The path to the destination file.
+        use_hash (bool): Compare content hashes when the size matches but the mtime does not.
+
+    Returns:
+        bool: True if the destination copy is up to date.
+    """
+    if entry is None or entry["size"] != stat.st_size or not os.path.exists(destination_file):
+        return False
+    if entry["mtime_ns"] == stat.st_mtime_ns:
+        return True
+    if use_hash and entry.get("hash"):
+        if file_hash(source_file) == entry["hash"]:
+            entry["mtime_ns"] = stat.st_mtime_ns
+            return True
+    return False
+
+class DedupIndex:
+    """Index of files in the destination, for finding duplicates by content.
+
+    Files are grouped by size first, and a file's hash is only computed once another
+    file of the same size shows up, so files with a unique size are never hashed.
+    A file is indexed as soon as a worker starts on it, so a duplicate that turns up
+    while it is still being copied waits for that copy and links to it instead of
+    being copied as well. Safe to share between worker threads.
+    """
+
+    def __init__(self):
+        # Size -> list of [source file, destination file, hash or None, done event, copied successfully]
+        self.by_size = {}
+        self.lock = threading.Lock()
+
+    def find(self, source_file: str, destination_file: str, size: int, digest: str = None) -> tuple:
+        """Look for a file in the destination with the same content as source_file, and claim source_file.
+
+        source_file is indexed as in flight before this returns; the caller must pass
+        the returned claim to done() once its copy or link has finished or failed. If the
+        duplicate found is still in flight, this waits for it.
+
+        Args:
+            source_file (str): The path to the source file.
+            destination_file (str): The path source_file will be copied to.
+            size (int): The size of the source file.
+            digest (str): The SHA-256 of the source file, if already known.
+
+        Returns:
+            tuple: (the destination path of a duplicate or None, the SHA-256 of source_file or None,
+            the claim for source_file).
+        """
+        claim = [source_file, destination_file, digest, threading.Event(), False]
+        with self.lock:
+            # Only files claimed earlier are candidates, so waits never go round in a circle
+            candidates = list(self.by_size.get(size, ()))
+            self.by_size.setdefault(size, []).append(claim)
+        if not candidates:
+            return None, digest, claim
+        if digest is None:
+            digest = claim[2] = file_hash(source_file)
+        for candidate in candidates:
+            if candidate[2] is None:
+                # Hash the candidate's source rather than its copy, which another worker may still be writing
+                candidate[2] = file_hash(candidate[0])
+            if candidate[2] == digest:
+                candidate[3].wait()
+                if candidate[4]:
+                    return candidate[1], digest, claim
+        return None, digest, claim
+
+    def done(self, claim: list, digest: str = None, copied: bool = True):
+        """Mark a file claimed by find() as finished, waking any duplicates waiting for it.
+
+        Args:
+            claim (list): The claim returned by find().
+            digest (str): The SHA-256 of the file, if it was computed while copying.
+            copied (bool): False if the copy failed, so waiting duplicates copy the file themselves.
+        """
+        if claim[2] is None:
+            claim[2] = digest
+        claim[4] = copied
+        claim[3].set()
+
+    def add(self, source_file: str, destination_file: str, size: int, digest: str = None):
+        """Record a file that is already in the destination.
+
+        Args:
+            source_file (str): The path to the source file.
+            destination_file (str): The path to its copy.
+            size (int): The size of the file.
+            digest (str): The SHA-256 of the file, if already known.
+        """
+        done = threading.Event()
+        done.set()
+        with self.lock:
+            self.by_size.setdefault(size, []).append([source_file, destination_file, digest, done, True])
+
+def link_duplicate(existing_file: str, destination_file: str) -> bool:
+    """Make destination_file share the data of existing_file instead of writing a copy.
+
+    A reflink (copy-on-write clone) is tried first where the filesystem supports it,
+    so the two files stay independent; otherwise a hardlink is made.
+
+    Args:
+        existing_file (str): A file already in the destination with the same content.
+        destination_file (str): The path to create.
+
+    Returns:
+        bool: True if a reflink or hardlink was made, False if neither is possible here.
+    """
+    if os.path.lexists(destination_file):
+        os.remove(destination_file)
+    if fcntl is not None:
+        try:
+            with open(existing_file, "rb") as src, open(destination_file, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            os.remove(destination_file)
+    try:
+        os.link(existing_file, destination_file)
+        return True
+    except OSError:
+        return False
+
+def unlink_if_shared(destination_file: str):
+    """Remove a destination file that is hardlinked to others before it is overwritten.
+
+    Copying over a hardlink writes into the shared data, which would change every
+    deduplicated copy of the file at once.
+
+    Args:
+        destination_file (str): The path to the destination file.
+    """
+    try:
+        if os.lstat(destination_file).st_nlink > 1:
+            os.remove(destination_file)
+    except FileNotFoundError:
+        pass
+
+def copy_one(source_file: str, destination_file: str, stat: os.stat_result, entry: dict, use_hash: bool,
+             dedup: DedupIndex = None) -> tuple:
+    """Copy a single file unless its manifest entry shows it is unchanged.
+
+    Only touches its own file and manifest entry, so it is safe to run in a worker thread.
+
+    Args:
+        source_file (str): The path to the source file.
+        destination_file (str): The path to the destination file.
+        stat (os.stat_result): The stat of the source file.
+        entry (dict): The manifest entry for the file, or None.
+        use_hash (bool): Record a content hash, and use it to detect unchanged files.
+        dedup (DedupIndex): Link files whose content is already in the destination instead of copying them.
+
+    Returns:
+        tuple: ("unchanged", "linked" or "copied", the manifest entry for the file).
+    """
+    if entry is not None and is_unchanged(entry, stat, source_file, destination_file, use_hash):
+        if dedup is not None:
+            dedup.add(source_file, destination_file, stat.st_size, entry.get("hash"))
+        return "unchanged", entry
+    os.makedirs(os.path.dirname(destination_file), exist_ok=True)
+    unlink_if_shared(destination_file)
+    digest = None
+    claim = None
+    copied = False
+    try:
+        if dedup is not None:
+            existing_file, digest, claim = dedup.find(source_file, destination_file, stat.st_size)
+            if existing_file is not None and link_duplicate(existing_file, destination_file):
+                if not os.path.samefile(existing_file, destination_file):
+                    shutil.copystat(source_file, destination_file)
+                copied = True
+                return "linked", {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "hash": digest,
+                }
+        if stat.st_size > LARGE_FILE_THRESHOLD:
+            progress = make_progress_printer(os.path.basename(source_file), stat.st_size)
+            digest = copy_large_file(source_file, destination_file, use_hash and digest is None, progress) or digest
+        else:
+            shutil.copy2(source_file, destination_file)
+            if use_hash and digest is None:
+                digest = file_hash(source_file)
+        copied = True
+    finally:
+        if claim is not None:
+            dedup.done(claim, digest, copied)
+    return "copied", {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest,
+    }
+
+def copy_large_file(source_file: str, destination_file: str, checksum: bool = False, progress=None,
+                    chunk_size: int = LARGE_FILE_CHUNK_SIZE) -> str:
+    """Copy a large file without loading it into memory.
+
+    Without a checksum the data is copied inside the kernel with os.copy_file_range or
+    os.sendfile, falling back to a chunked copy where neither works for these files.
+    With a checksum the chunked copy is used, hashing each chunk as it passes through
+    one reusable buffer, so the file is read only once.
+
+    Args:
+        source_file (str): The path to the source file.
+        destination_file (str): The path to the destination file.
+        checksum (bool): Compute the SHA-256 of the data while copying.
+        progress: Called with the number of bytes copied so far after each chunk.
+        chunk_size (int): The number of bytes copied per step.
+
+    Returns:
+        str: The hex SHA-256 if checksum is True, otherwise None.
+    """
+    digest = hashlib.sha256() if checksum else None
+    with open(source_file, "rb", buffering=0) as src, open(destination_file, "wb", buffering=0) as dst:
+        if digest is not None or not kernel_copy(src.fileno(), dst.fileno(), progress, chunk_size):
+            chunked_copy(src, dst, digest, progress, chunk_size)
+    shutil.copystat(source_file, destination_file)
+    return digest.hexdigest() if digest is not None else None
+
+def kernel_copy(src_fd: int, dst_fd: int, progress=None, chunk_size: int = LARGE_FILE_CHUNK_SIZE) -> bool:
+    """Copy from src_fd to dst_fd inside the kernel.
+
+    Args:
+        src_fd (int): The source file descriptor, positioned at the start.
+        dst_fd (int): The destination file descriptor, positioned at the start.
+        progress: Called with the number of bytes copied so far after each chunk.
+        chunk_size (int): The number of bytes copied per system call.
+
+    Returns:
+        bool: True if the file was copied, False if no kernel copy is supported for these files.
+    """
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(lambda count: os.copy_file_range(src_fd, dst_fd, count))
+    if hasattr(os, "sendfile"):
+        methods.append(lambda count: os.sendfile(dst_fd, src_fd, None, count))
+    for method in methods:
+        copied = 0
+        try:
+            while True:
+                sent = method(chunk_size)
+                if not sent:
+                    return True
+                copied += sent
+                if progress:
+                    progress(copied)
+        except OSError as e:
+            # Only fall back if nothing was written; a failure part way through is a real error
+            if copied or e.errno not in KERNEL_COPY_UNSUPPORTED:
+                raise
+    return False
+
+def chunked_copy(src, dst, digest=None, progress=None, chunk_size: int = LARGE_FILE_CHUNK_SIZE):
+    """Copy between unbuffered binary files through one reusable buffer.
+
+    Args:
+        src: The source file, opened with buffering=0.
+        dst: The destination file, opened with buffering=0.
+        digest: A hashlib object to update with the data, or None.
+        progress: Called with the number of bytes copied so far after each chunk.
+        chunk_size (int): The size of the buffer.
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    copied = 0
+    while True:
+        count = src.readinto(buffer)
+        if not count:
+            break
+        chunk = view[:count]
+        if digest is not None:
+            digest.update(chunk)
+        while chunk:
+            written = dst.write(chunk)
+            chunk = chunk[written:]
+        copied += count
+        if progress:
+            progress(copied)
+
+def make_progress_printer(name: str, total: int, step: int = 10):
+    """Make a progress callback that prints every step percent.
+
+    Args:
+        name (str): The file name to show.
+        total (int): The expected number of bytes.
+        step (int): The percentage between messages.
+
+    Returns:
+        The callback, taking the number of bytes copied so far.
+    """
+    next_percent = [step]
+
+    def progress(copied: int):
+        percent = copied * 100 // total if total else 100
+        if percent >= next_percent[0]:
+            print(f"{name}: {percent}% ({copied / (1024 * 1024):.0f} MB)", flush=True)
+            next_percent[0] = (percent // step + 1) * step
+
+    return progress
+
+def scan_tree(source: str, on_error=None):
+    """Walk source with os.scandir, yielding each file with its stat.
+
+    DirEntry caches the file type from the directory listing, so telling files from
+    folders costs no extra system calls, and each file is stat'ed exactly once.
+    Symlinks to folders are listed but not followed, as with os.walk().
+
+    Args:
+        source (str): The path to the source folder.
+        on_error: Called with (path, error) for entries that cannot be read; errors are logged if None.
+
+    Yields:
+        tuple: (path relative to source, full path, os.stat_result).
+    """
+    stack = [(source, "")]
+    while stack:
+        folder, relative_folder = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    relative_file = os.path.join(relative_folder, entry.name) if relative_folder else entry.name
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                stack.append((entry.path, relative_file))
+                            continue
+                        stat = entry.stat()
+                    except OSError as e:
+                        if on_error:
+                            on_error(entry.path, e)
+                        else:
+                            log_action(f"Error reading {entry.path}: {str(e)}")
+                        continue
+                    yield relative_file, entry.path, stat
+        except OSError as e:
+            if on_error:
+                on_error(folder, e)
+            else:
+                log_action(f"Error reading {folder}: {str(e)}")
+
+def has_ancestor_in(relative_path: str, paths: set) -> bool:
+    """Check whether any folder above relative_path is in paths.
+
+    Args:
+        relative_path (str): A path relative to the source folder.
+        paths (set): Other relative paths.
+
+    Returns:
+        bool: True if a parent folder of relative_path is in paths.
+    """
+    parent = os.path.dirname(relative_path)
+    while parent:
+        if parent in paths:
+            return True
+        parent = os.path.dirname(parent)
+    return False
+
+def scan_paths(source: str, paths, on_error=None):
+    """Yield the files at the given paths under source, expanding folders.
+
+    Paths that no longer exist are skipped.
+
+    Args:
+        source (str): The path to the source folder.
+        paths: Paths relative to source; "" means the whole tree.
+        on_error: Called with (path, error) for entries that cannot be read; errors are logged if None.
+
+    Yields:
+        tuple: (path relative to source, full path, os.stat_result).
+    """
+    if "" in paths:
+        paths = [""]
+    paths = set(paths)
+    for relative_path in sorted(paths):
+        if has_ancestor_in(relative_path, paths):
+            continue  # Already covered by scanning the folder above it
+        full_path = os.path.join(source, relative_path) if relative_path else source
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            if on_error:
+                on_error(full_path, e)
+            continue
+        if not os.path.isdir(full_path):
+            yield relative_path, full_path, stat
+            continue
+        for relative_file, source_file, file_stat in scan_tree(full_path, on_error):
+            yield os.path.join(relative_path, relative_file) if relative_path else relative_file, source_file, file_stat
+
+def plan_copy(source: str, manifest: dict = None, largest: int = 10) -> dict:
+    """Work out what a copy would do without copying anything.
+
+    Args:
+        source (str): The path to the source folder.
+        manifest (dict): The destination manifest, used to leave out unchanged files.
+        largest (int): The number of largest files to list.
+
+    Returns:
+        dict: File and byte counts for the whole tree and for the files that would be
+        copied, and the largest files to copy as (size, relative path) pairs.
+    """
+    plan = {"files": 0, "bytes": 0, "copy_files": 0, "copy_bytes": 0, "largest": []}
+    sizes = []
+    for relative_file, _, stat in scan_tree(source):
+        plan["files"] += 1
+        plan["bytes"] += stat.st_size
+        entry = manifest.get(relative_file) if manifest else None
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            continue
+        plan["copy_files"] += 1
+        plan["copy_bytes"] += stat.st_size
+        sizes.append((stat.st_size, relative_file))
+        if len(sizes) > largest * 64:
+            sizes = heapq.nlargest(largest, sizes)
+    plan["largest"] = heapq.nlargest(largest, sizes)
+    return plan
+
+def format_plan(plan: dict, megabytes_per_second: float = PLAN_MEGABYTES_PER_SECOND,
+                seconds_per_file: float = PLAN_SECONDS_PER_FILE) -> str:
+    """Format a copy plan as a report, with an estimated copy time.
+
+    Args:
+        plan (dict): The plan returned by plan_copy().
+        megabytes_per_second (float): The assumed transfer rate.
+        seconds_per_file (float): The assumed per-file overhead (open, create, set times).
+
+    Returns:
+        str: The report.
+    """
+    megabytes = plan["copy_bytes"] / (1024 * 1024)
+    estimate = megabytes / megabytes_per_second + plan["copy_files"] * seconds_per_file
+    lines = [
+        f"Source: {plan['files']} files, {plan['bytes'] / (1024 * 1024):.1f} MB",
+        f"To copy: {plan['copy_files']} files, {megabytes:.1f} MB",
+        f"Estimated copy time: {estimate:.1f}s at {megabytes_per_second:g} MB/s and {seconds_per_file * 1000:g} ms/file",
+    ]
+    if plan["largest"]:
+        lines.append("Largest files to copy:")
+        lines.extend(f"  {size / (1024 * 1024):10.1f} MB  {path}" for size, path in plan["largest"])
+    return "\n".join(lines)
+
+def copy_files(source: str, destination: str, manifest: dict = None, use_hash: bool = False,
+               workers: int = 1, dedup: bool = False, paths=None) -> dict:
     """Copy files from source to destination.
 
+    Files are copied by a pool of worker threads while the directory walk continues.
+    Files over LARGE_FILE_THRESHOLD are copied with copy_large_file().
+    Results are logged in walk order whatever order the copies finish in, so the log
+    is the same for any number of workers. When a manifest is given, files whose size
+    and mtime match their manifest entry are skipped, and the manifest is updated with
+    every file that is copied. With dedup, a file whose content is already in the
+    destination becomes a reflink or hardlink to it instead of a new copy.
+
+    Args:
+        source (str): The path to the source folder.
+        destination (str): The path to the destination folder.
+        manifest (dict): The manifest from load_manifest(), or None to copy everything.
+        use_hash (bool): Record content hashes and use them to detect unchanged files.
+        workers (int): The number of files copied at the same time.
+        dedup (bool): Link duplicate files instead of copying them again.
+        paths: Only copy these files and folders, given relative to source, instead of the whole tree.
+
+    Returns:
+        dict: Counts of copied, linked, unchanged and failed files, bytes copied and saved, and seconds taken.
+    """
+    stats = {"copied": 0, "linked": 0, "unchanged": 0, "errors": 0, "bytes": 0, "saved": 0, "seconds": 0.0}
+    dedup_index = DedupIndex() if dedup else None
+    start = time.perf_counter()
+    # Files in walk order: (file name, destination file, relative file, size, future)
+    pending = deque()
+    max_pending = workers * 64  # Bounds memory when the walk is far ahead of the copies
+
+    def finish(item):
+        file, destination_file, relative_file, size, future = item
+        try:
+            status, entry = future.result()
+        except Exception as e:
+            log_action(f"Error copying {file}: {str(e)}")
+            stats["errors"] += 1
+            return
+        if status == "unchanged":
+            stats["unchanged"] += 1
+            return
+        if status == "linked":
+            log_action(f"File linked: {file} to {destination_file} (duplicate)")
+            stats["linked"] += 1
+            stats["saved"] += size
+        else:
+            log_action(f"File copied: {file} to {destination_file}")
+            stats["copied"] += 1
+            stats["bytes"] += size
+        if manifest is not None:
+            manifest[relative_file] = entry
+
+    def scan_error(path, error):
+        log_action(f"Error copying {os.path.basename(path)}: {str(error)}")
+        stats["errors"] += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        files = scan_tree(source, scan_error) if paths is None else scan_paths(source, paths, scan_error)
+        for relative_file, source_file, stat in files:
+            destination_file = os.path.join(destination, relative_file)
+            entry = manifest.get(relative_file) if manifest is not None else None
+            future = pool.submit(copy_one, source_file, destination_file, stat, entry, use_hash, dedup_index)
+            pending.append((os.path.basename(relative_file), destination_file, relative_file, stat.st_size, future))
+
+            # Log whatever has finished at the front of the queue, waiting if too far ahead
+            while pending and (pending[0][4].done() or len(pending) > max_pending):
+                finish(pending.popleft())
+        while pending:
+            finish(pending.popleft())
+
+    if stats["unchanged"]:
+        log_action(f"Skipped {stats['unchanged']} unchanged files")
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+class InotifyWatcher:
+    """Report changed paths under a folder using Linux inotify.
+
+    inotify only watches single folders, so every folder in the tree gets its own
+    watch, and folders created later are watched as they appear.
+    """
+
+    def __init__(self, source: str):
+        """
+        Args:
+            source (str): The folder to watch.
+
+        Raises:
+            OSError: If inotify is not available.
+        """
+        self.source = source
+        self.folders = {}  # Watch descriptor -> folder path relative to source
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True) if libc_name else None
+        if self.libc is None or not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.add_tree("")
+
+    def add_tree(self, relative_folder: str):
+        """Watch a folder and every folder below it.
+
+        Args:
+            relative_folder (str): The folder, relative to source.
+        """
+        stack = [relative_folder]
+        while stack:
+            relative = stack.pop()
+            folder = os.path.join(self.source, relative) if relative else self.source
+            watch = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), INOTIFY_MASK)
+            if watch < 0:
+                continue  # Removed again before we got to it
+            self.folders[watch] = relative
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(os.path.join(relative, entry.name) if relative else entry.name)
+            except OSError:
+                pass
+
+    def wait(self, timeout: float = None) -> set:
+        """Wait for changes.
+
+        Args:
+            timeout (float): The maximum seconds to wait, or None to wait until something changes.
+
+        Returns:
+            set: Changed paths relative to source ("" if events were lost and everything should be rescanned).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            watch, mask, _, length = struct.unpack_from("iIII", data, offset)
+            name = os.fsdecode(data[offset + 16:offset + 16 + length].rstrip(b"\0"))
+            offset += 16 + length
+            if mask & IN_Q_OVERFLOW:
+                changed.add("")
+                continue
+            if mask & IN_IGNORED:
+                self.folders.pop(watch, None)
+                continue
+            folder = self.folders.get(watch)
+            if folder is None or not name:
+                continue
+            relative = os.path.join(folder, name) if folder else name
+            changed.add(relative)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(relative)
+        return changed
+
+    def close(self):
+        """Stop watching."""
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Report changed paths under a folder by rescanning it, where inotify is not available."""
+
+    def __init__(self, source: str, interval: float = 2.0):
+        """
+        Args:
+            source (str): The folder to watch.
+            interval (float): Seconds between scans.
+        """
+        self.source = source
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self) -> dict:
+        """Return relative path -> (size, mtime_ns) for every file under source."""
+        return {relative_file: (stat.st_size, stat.st_mtime_ns)
+                for relative_file, _, stat in scan_tree(self.source, lambda path, error: None)}
+
+    def wait(self, timeout: float = None) -> set:
+        """Rescan every interval until something changes or timeout seconds pass.
+
+        Args:
+            timeout (float): The maximum seconds to wait, or None to wait until something changes.
+
+        Returns:
+            set: Changed, added and removed paths relative to source.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+            snapshot = self.scan()
+            changed = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+            changed.update(path for path in self.snapshot if path not in snapshot)
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        """Stop watching."""
+
+def remove_deleted(source: str, destination: str, manifest: dict, paths) -> int:
+    """Remove the copies of paths that no longer exist in source.
+
+    Args:
+        source (str): The path to the source folder.
+        destination (str): The path to the destination folder.
+        manifest (dict): The manifest, updated to drop removed files.
+        paths: Paths relative to source.
+
+    Returns:
+        int: The number of files and folders removed.
+    """
+    removed = 0
+    for relative_path in sorted(paths):
+        if not relative_path or os.path.lexists(os.path.join(source, relative_path)):
+            continue
+        destination_path = os.path.join(destination, relative_path)
+        try:
+            if os.path.isdir(destination_path) and not os.path.islink(destination_path):
+                shutil.rmtree(destination_path)
+            elif os.path.lexists(destination_path):
+                os.remove(destination_path)
+            else:
+                continue
+        except OSError as e:
+            log_action(f"Error removing {destination_path}: {str(e)}")
+            continue
+        log_action(f"File removed: {destination_path}")
+        removed += 1
+        prefix = relative_path + os.sep
+        for relative_file in [key for key in manifest if key == relative_path or key.startswith(prefix)]:
+            del manifest[relative_file]
+    return removed
+
+def watch_and_mirror(source: str, destination: str, manifest: dict, use_hash: bool = False, workers: int = 1,
+                     dedup: bool = False, debounce: float = WATCH_DEBOUNCE_SECONDS):
+    """Keep destination mirrored to source until interrupted.
+
+    Changes are collected until the source has been quiet for debounce seconds (or
+    for at most WATCH_MAX_DELAY_FACTOR times that during a constant stream of
+    changes), then only the changed paths are passed to copy_files(). Paths deleted
+    from the source are removed from the destination.
+
     Args:
         source (str): The path to the source folder.
         destination (str): The path to the destination folder.
+        manifest (dict): The manifest, saved after every sync.
+        use_hash (bool): Record content hashes and use them to detect unchanged files.
+        workers (int): The number of files copied at the same time.
+        dedup (bool): Link duplicate files instead of copying them again.
+        debounce (float): Seconds of quiet to wait for before syncing.
     """
-    for root, dirs, files in os.walk(source):
-        for file in files:
-            source_file = os.path.join(root, file)
-            if os.path.getsize(source_file) <= 1e9:  # 1 GB limit
-                try:
-                    relative_path = os.path.relpath(root, source)
-                    destination_folder = os.path.join(destination, relative_path)
-                    destination_file = os.path.join(destination_folder, file)
-                    
-                    if not os.path.exists(destination_folder):
-                        os.makedirs(destination_folder)
-                    shutil.copy2(source_file, destination_file)
-                    log_action(f"File copied: {file} to {destination_file}")
-                except Exception as e:
-                    log_action(f"Error copying {file}: {str(e)}")
+    try:
+        watcher = InotifyWatcher(source)
+        print(f"Watching {source} with inotify. Press Ctrl+C to stop.")
+    except OSError:
+        watcher = PollingWatcher(source, debounce)
+        print(f"Watching {source} by polling every {debounce}s. Press Ctrl+C to stop.")
+    changed = set()
+    first_change = None
+    try:
+        while True:
+            if changed:
+                remaining = first_change + debounce * WATCH_MAX_DELAY_FACTOR - time.monotonic()
+                events = watcher.wait(max(0.0, min(debounce, remaining))) if remaining > 0 else set()
             else:
-                log_action(f"Skipped: {file} (file size exceeds 1 GB)")
+                events = watcher.wait()
+            if events:
+                if not changed:
+                    first_change = time.monotonic()
+                changed |= events
+                if time.monotonic() - first_change < debounce * WATCH_MAX_DELAY_FACTOR:
+                    continue
+            if not changed:
+                continue
+            remove_deleted(source, destination, manifest, changed)
+            stats = copy_files(source, destination, manifest, use_hash, workers, dedup, paths=changed)
+            save_manifest(destination, manifest)
+            summary = format_summary(stats)
+            log_action(summary)
+            print(summary)
+            changed = set()
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        watcher.close()
+
+def format_summary(stats: dict) -> str:
+    """Format copy statistics as a one-line throughput summary.
+
+    Args:
+        stats (dict): The statistics returned by copy_files().
+
+    Returns:
+        str: The summary.
+    """
+    seconds = stats["seconds"] or 1e-9
+    megabytes = stats["bytes"] / (1024 * 1024)
+    summary = (f"Copied {stats['copied']} files ({megabytes:.1f} MB) in {stats['seconds']:.2f}s: "
+               f"{stats['copied'] / seconds:.1f} files/s, {megabytes / seconds:.1f} MB/s; "
+               f"{stats['unchanged']} unchanged, {stats['errors']} errors")
+    if stats["linked"]:
+        summary += f"; {stats['linked']} duplicates linked, {stats['saved'] / (1024 * 1024):.1f} MB saved"
+    return summary
+
+def verify_destination(destination: str, manifest: dict) -> int:
+    """Check every file in the manifest against its copy in the destination.
+
+    Files that are missing, have the wrong size, or (when a hash was recorded) have
+    different contents are removed from the manifest, so the next copy replaces them.
+
+    Args:
+        destination (str): The path to the destination folder.
+        manifest (dict): The manifest from load_manifest().
+
+    Returns:
+        int: The number of files that failed verification.
+    """
+    failed = 0
+    for relative_file, entry in list(manifest.items()):
+        destination_file = os.path.join(destination, relative_file)
+        try:
+            if os.path.getsize(destination_file) != entry["size"]:
+                problem = "size mismatch"
+            elif entry.get("hash") and file_hash(destination_file) != entry["hash"]:
+                problem = "hash mismatch"
+            else:
+                continue
+        except OSError as e:
+            problem = str(e)
+        log_action(f"Verify failed: {destination_file} ({problem})")
+        del manifest[relative_file]
+        failed += 1
+    log_action(f"Verified {len(manifest)} files, {failed} failed")
+    return failed
+
+class ActionLogger:
+    """Buffered writer for the action log.
+
+    Lines are collected in memory and appended to the log file in batches: when the
+    buffer reaches batch_size lines, when flush_interval seconds have passed (checked
+    by a background timer), and when the logger is closed. The file is opened once
+    instead of once per line, unless reopen is set; batch_size=1 with reopen=True
+    writes every line straight away the way log_action() originally did.
+    """
+
+    def __init__(self, path: str = "log.txt", batch_size: int = 1000, flush_interval: float = 1.0,
+                 json_lines: bool = False, reopen: bool = False):
+        """
+        Args:
+            path (str): The log file to append to.
+            batch_size (int): The number of buffered lines that triggers a flush.
+            flush_interval (float): The maximum seconds a line waits in the buffer.
+            json_lines (bool): Write each action as a JSON object with a timestamp instead of plain text.
+            reopen (bool): Open and close the log file for every write instead of keeping it open.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.json_lines = json_lines
+        self.reopen = reopen
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.log_file = None if reopen else open(path, "a")
+        self.closed = threading.Event()
+        self.timer = threading.Thread(target=self._flush_periodically, daemon=True)
+        self.timer.start()
+
+    def log(self, action: str):
+        """Buffer one action.
+
+        Args:
+            action (str): The action to be logged.
+        """
+        if self.json_lines:
+            line = json.dumps({"time": datetime.now().isoformat(timespec="milliseconds"), "action": action})
+        else:
+            line = action
+        with self.lock:
+            self.buffer.append(line)
+            if len(self.buffer) >= self.batch_size:
+                self._write_buffer()
+
+    def flush(self):
+        """Write all buffered actions to the log file."""
+        with self.lock:
+            self._write_buffer()
+
+    def close(self):
+        """Flush the buffer, stop the timer and close the log file."""
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        self.timer.join()
+        with self.lock:
+            self._write_buffer()
+            if self.log_file is not None:
+                self.log_file.close()
+
+    def _write_buffer(self):
+        """Write the buffer in a single call. The caller must hold the lock."""
+        if not self.buffer:
+            return
+        if self.reopen:
+            with open(self.path, "a") as log_file:
+                log_file.write("\n".join(self.buffer) + "\n")
+        else:
+            self.log_file.write("\n".join(self.buffer) + "\n")
+            self.log_file.flush()
+        self.buffer.clear()
+
+    def _flush_periodically(self):
+        """Flush every flush_interval seconds until the logger is closed."""
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+_logger = None
+
+def configure_logging(path: str = "log.txt", batch_size: int = 1000, flush_interval: float = 1.0,
+                      json_lines: bool = False, reopen: bool = False) -> ActionLogger:
+    """Replace the logger used by log_action(), closing the previous one.
+
+    Args:
+        path (str): The log file to append to.
+        batch_size (int): The number of buffered lines that triggers a flush.
+        flush_interval (float): The maximum seconds a line waits in the buffer.
+        json_lines (bool): Write JSON lines instead of plain text.
+        reopen (bool): Open and close the log file for every write.
+
+    Returns:
+        ActionLogger: The new logger.
+    """
+    global _logger
+    if _logger is not None:
+        _logger.close()
+    _logger = ActionLogger(path, batch_size, flush_interval, json_lines, reopen)
+    return _logger
+
+def close_logging():
+    """Flush and close the logger used by log_action(). Registered to run at exit."""
+    global _logger
+    if _logger is not None:
+        _logger.close()
+        _logger = None
+
+atexit.register(close_logging)
 
 def log_action(action: str):
     """Log actions to log.txt file.
 
+    Actions are buffered; see ActionLogger.
+
     Args:
         action (str): The action to be logged.
     """
-    with open("log.txt", "a") as log_file:
-        log_file.write(action + "\n")
+    if _logger is None:
+        configure_logging()
+    _logger.log(action)
+
+def benchmark_logging(file_count: int = 100000):
+    """Time copying a synthetic tree of small files with per-line and buffered logging.
+
+    The per-line run reopens the log file for every action, as log_action() used to.
+    Both runs go through configure_logging(), so copy_files() logs the same way it does normally.
+
+    Args:
+        file_count (int): The number of files in the synthetic tree.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "source")
+        for index in range(file_count):
+            folder = os.path.join(source, f"dir_{index // 1000:03d}")
+            if index % 1000 == 0:
+                os.makedirs(folder)
+            with open(os.path.join(folder, f"file_{index:06d}.txt"), "w") as f:
+                f.write("x" * 64)
+
+        results = []
+        for name, batch_size, reopen in (("per-line", 1, True), ("buffered", 1000, False)):
+            configure_logging(os.path.join(temp_dir, f"{name}_log.txt"), batch_size, reopen=reopen)
+            try:
+                start = time.perf_counter()
+                copy_files(source, os.path.join(temp_dir, f"destination_{name}"), workers=1)
+            finally:
+                close_logging()
+            results.append((name, time.perf_counter() - start))
+        for name, seconds in results:
+            print(f"{name} logging: {file_count} files in {seconds:.2f}s ({file_count / seconds:.0f} files/s)")
 
 def main():
-    source = input("Enter the source folder: ")
-    destination = input("Enter the destination folder: ")
+    parser = argparse.ArgumentParser(description="Copy a folder, skipping files that are already up to date.")
+    parser.add_argument("source", nargs="?", help="The source folder (prompted for if omitted).")
+    parser.add_argument("destination", nargs="?", help="The destination folder (prompted for if omitted).")
+    parser.add_argument("--full", action="store_true", help="Copy every file, ignoring the manifest.")
+    parser.add_argument("--hash", action="store_true", help="Record content hashes in the manifest.")
+    parser.add_argument("--verify", action="store_true",
+                        help="Check destination files against the manifest and re-copy any that fail.")
+    parser.add_argument("--workers", type=int, default=8, help="Number of files copied at the same time.")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Reflink or hardlink files whose content was already copied instead of copying them again.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report what would be copied and an estimated copy time without copying anything.")
+    parser.add_argument("--rate", type=float, default=PLAN_MEGABYTES_PER_SECOND,
+                        help="Assumed MB/s for the dry-run estimate.")
+    parser.add_argument("--per-file-ms", type=float, default=PLAN_SECONDS_PER_FILE * 1000,
+                        help="Assumed per-file overhead in milliseconds for the dry-run estimate.")
+    parser.add_argument("--watch", action="store_true",
+                        help="After copying, keep the destination mirrored to the source until interrupted.")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE_SECONDS,
+                        help="Seconds of quiet to wait for before syncing changes in watch mode.")
+    parser.add_argument("--json-log", action="store_true", help="Write log.txt as JSON lines.")
+    parser.add_argument("--benchmark-logging", type=int, metavar="FILES",
+                        help="Benchmark per-line against buffered logging on a synthetic tree of FILES files.")
+    args = parser.parse_args()
+
+    if args.benchmark_logging:
+        benchmark_logging(args.benchmark_logging)
+        return
+    configure_logging(json_lines=args.json_log)
+
+    source = args.source or input("Enter the source folder: ")
+    destination = args.destination or input("Enter the destination folder: ")
 
     # Check if source folder exists
     if not os.path.exists(source):
         print("Source folder does not exist.")
         return
 
+    if args.dry_run:
+        manifest = {} if args.full else load_manifest(destination)
+        print(format_plan(plan_copy(source, manifest), args.rate, args.per_file_ms / 1000))
+        return
+
     create_destination_folder(destination)
 
+    manifest = {} if args.full else load_manifest(destination)
     try:
-        copy_files(source, destination)
+        if args.verify:
+            failed = verify_destination(destination, manifest)
+            print(f"Verification found {failed} bad or missing files.")
+        stats = copy_files(source, destination, manifest, args.hash, args.workers, args.dedup)
     except Exception as e:
         print("An error occurred:", str(e))
     else:
         print("Copy operation completed successfully.")
+        summary = format_summary(stats)
+        log_action(summary)
+        print(summary)
+        if args.watch:
+            save_manifest(destination, manifest)
+            watch_and_mirror(source, destination, manifest, args.hash, args.workers, args.dedup, args.debounce)
+    finally:
+        save_manifest(destination, manifest)
+        close_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -79,8 +79,7 @@ def zip_logs():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     logs_dir = os.path.join(script_dir, "logs")
     zip_path = os.path.join(script_dir, "text_files", "results.zip")
-    shutil.make_archive(logs_dir, 'zip', logs_dir)
-    os.rename(f"{logs_dir}.zip", zip_path)
+    shutil.make_archive(os.path.splitext(zip_path)[0], 'zip', logs_dir)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,117 @@
+import argparse
+import bisect
+import calendar
+import csv
+import hashlib
+import io
+import ipaddress
+import json
+import math
 import os
+import random
 import re
 import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from collections import Counter, deque
+from functools import lru_cache
 from send2trash import send2trash
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Apache combined log format with the vhost appended, for example:
+# 157.55.39.98 - - [15/Sep:05:34:56 -0600] "GET /a.png HTTP/1.1" 200 25950 "-" "bingbot/2.0" www.example.com
+COMBINED_LOG_REGEX = re.compile(
+    r'([^ ]+) [^ ]+ [^ ]+ \[([^\]]*)\] '
+    r'"(?:([^ "]+) ([^ "]+)[^"]*|[^"]*)" '
+    r'(\d{3}) (\d+|-) '
+    r'"[^"]*" "([^"]*)"'
+    r'(?: ([^ \r\n]+))?'
+)
+# The older comma-separated format, which starts with the source IP
+CSV_LOG_REGEX = re.compile(r'([\d.]+),')
+# Suspicious-request rules; see load_rules()
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "text_files", "rules.json")
+# Owner, country and crawler of known IPv4 networks; see IpRanges
+DEFAULT_IP_RANGES_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "text_files", "ip_ranges.csv")
+# Fields rules can apply to, as indexes into COMBINED_LOG_REGEX groups; "line" is the whole raw line
+RULE_FIELDS = {'ip': 0, 'ts': 1, 'method': 2, 'path': 3, 'status': 4, 'bytes': 5, 'ua': 6, 'vhost': 7, 'line': None}
+TIMESTAMP_REGEX = re.compile(r'(\d{1,2})/(\w{3})(?:/(\d{4}))?:(\d{2}):(\d{2}):(\d{2})(?: ([+-])(\d{2})(\d{2}))?')
+MONTHS = {name: number for number, name in enumerate(calendar.month_abbr) if name}
+# The sample logs leave the year out of their timestamps; those are read as this year
+DEFAULT_YEAR = 1970
+
+# Files in the logs folder that are not logs
+NON_LOG_FILES = {"matches.txt", "hit_counts.json", "checkpoints.json", "ip_index.db", "rate_alerts.json",
+                 "traffic_sketch.json", "matches_enriched.csv"}
+# In parallel mode, log files larger than this are split into parts of about this size
+DEFAULT_SPLIT_SIZE = 64 * 1024 * 1024
+# Request-rate windows: counts are kept in buckets of BURST_BUCKET_SECONDS over a window of
+# BURST_WINDOW_SECONDS, and a window holding at least the threshold for its kind is a burst
+BURST_WINDOW_SECONDS = 60
+BURST_BUCKET_SECONDS = 10
+BURST_THRESHOLDS = {'ip': 120, 'vhost': 300, 'login': 10}
+# Requests counted in the "login" windows, per IP, to catch password guessing
+LOGIN_PATH_REGEX = re.compile(r'/wp-login\.php|/xmlrpc\.php|/administrator/|/user/login', re.IGNORECASE)
+# Sketch mode: counters kept per top-N list, and HyperLogLog precision (2**12 registers, about 1.6% error)
+DEFAULT_SKETCH_CAPACITY = 1000
+DEFAULT_HLL_PRECISION = 12
+# Synthetic logs (see generate_logs()): vhosts and their share of the traffic, and what lines are made of
+GENERATOR_VHOST_MIX = {"culinaryartsacademy.org": 4, "performingarts.school": 3, "yourfoundraisers.com": 2,
+                       "detroitcandyshoppe.com": 1}
+GENERATOR_PATHS = [
+    "/", "/", "/index.php", "/robots.txt", "/favicon.ico", "/feed/", "/about-us/", "/contact-us/", "/events/",
+    "/wp-content/uploads/07/USA_LOGO_CMYK-1.png", "/wp-content/uploads/07/USA_LOGO_CMYK-1@2x.png",
+    "/wp-includes/js/jquery/jquery.js?ver=1.12.4", "/wp-includes/css/dist/block-library/style.min.css?ver=5.2.3",
+    "/wp-content/plugins/easymega/assets/js/megamenu-wp.js?ver=1.0.1", "/wp-cron.php?doing_wp_cron=1568607758",
+    "/product-category/events/?product_order=asc&product_view=grid&paged=1",
+]
+GENERATOR_STATUSES = [200] * 26 + [406] * 3 + [404, 304, 301, 409]
+GENERATOR_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.75 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 12_4_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/12.1.2 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 9; SM-G960U) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/76.0.3809.132 "
+    "Mobile Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/12.1.2 "
+    "Safari/605.1.15",
+    "Mozilla/5.0 (compatible; DotBot/1.1; http://www.opensiteexplorer.org/dotbot, help@moz.com)",
+    "WordPress/5.1.2; http://culinaryartsacademy.org",
+]
+# Crawlers get their own addresses, as in the real logs
+GENERATOR_CRAWLERS = [
+    ("157.55.39.", "Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)"),
+    ("207.46.13.", "Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)"),
+    ("66.249.66.", "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"),
+]
+# Requests the default rules catch, with the status they get
+GENERATOR_ATTACKS = [
+    ("GET", "/wp-content/themes/TheLoft/download.php?file=../../../wp-config.php", 403),
+    ("GET", "/wp-login.php?action=register", 302),
+    ("GET", "/index.php?id=1+union+select+user_pass+from+wp_users", 403),
+    ("GET", "/install.php", 404),
+    ("POST", "/xmlrpc.php", 403),
+    ("POST", "/wp-login.php", 403),
+]
+# Generated logs start at 15/Sep 00:00 local time, in the -0600 zone of the sample logs
+GENERATOR_UTC_OFFSET = -6 * 3600
+GENERATOR_START = calendar.timegm((DEFAULT_YEAR, 9, 15, 0, 0, 0)) - GENERATOR_UTC_OFFSET
+# Compression level for results.zip (zlib's own default)
+DEFAULT_ZIP_LEVEL = 6
+# Files that are compressed already; deflating them again only costs time
+STORED_EXTENSIONS = {".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".png", ".jpg", ".jpeg", ".gif", ".webp"}
+# ResultsArchiver.write_deflated() mirrors ZipFile._open_to_write() and uses these ZipFile
+# internals, which are unchanged in CPython 3.7 (the first with ZipFile(compresslevel=)) to 3.13;
+# elsewhere members are deflated by ZipFile.write()
+ZIPFILE_INTERNALS = ("_lock", "_writing", "_writecheck", "_didModify", "start_dir", "fp", "filelist", "NameToInfo")
+RAW_ZIP_WRITE_VERSIONS = ((3, 7), (3, 14))
+# Compressed members are kept in memory up to this size before spilling to a temporary file
+ZIP_SPOOL_SIZE = 16 * 1024 * 1024
 
 def extract_zip(zip_file, extract_to):
     """Extracts the contents of a ZIP file."""
@@ -10,31 +119,996 @@ def extract_zip(zip_file, extract_to):
         for file_info in zip_ref.infolist():
             zip_ref.extract(file_info, extract_to)
 
-def process_logs(logs_dir, output_file):
-    """Processes log files and logs matches."""
-    matches = set()  # Set to store unique matches
+def is_log_file(file):
+    """Tells whether a file name is a log file to process.
+
+    The access logs are named after their vhost (candy_store.com) rather than ending in .log.
+    Compressed files (STORED_EXTENSIONS), such as rotated candy_store.com.1.gz, are skipped
+    rather than read as text.
+    """
+    return not (file in NON_LOG_FILES or file.startswith("processed_")
+                or os.path.splitext(file)[1].lower() in STORED_EXTENSIONS)
+
+@lru_cache(maxsize=65536)
+def parse_timestamp(text):
+    """Parses a log timestamp such as 15/Sep:05:34:56 -0600 into seconds since the epoch (UTC).
+
+    Lines logged in the same second share a timestamp, so results are cached.
+    Returns -1 if the timestamp cannot be read.
+    """
+    match = TIMESTAMP_REGEX.match(text)
+    if not match or match.group(2) not in MONTHS:
+        return -1
+    day, month, year, hour, minute, second, sign, tz_hours, tz_minutes = match.groups()
+    seconds = calendar.timegm((int(year) if year else DEFAULT_YEAR, MONTHS[month], int(day),
+                               int(hour), int(minute), int(second)))
+    if sign:
+        offset = int(tz_hours) * 3600 + int(tz_minutes) * 60
+        seconds -= offset if sign == '+' else -offset
+    return seconds
+
+class LogColumns:
+    """Parsed access log lines stored column by column in compact arrays.
+
+    ts, status and bytes are numeric arrays. The string columns (ip, method, path, ua,
+    vhost, file) hold integer codes into the shared strings list, so each distinct
+    value is stored once.
+    """
+
+    def __init__(self):
+        self.ip = array('I')
+        self.ts = array('q')
+        self.method = array('I')
+        self.path = array('I')
+        self.status = array('H')
+        self.bytes = array('q')
+        self.ua = array('I')
+        self.vhost = array('I')
+        self.file = array('I')
+        self.strings = []
+        self.codes = {}
+        self.unparsed = 0
+
+    def __len__(self):
+        return len(self.ts)
+
+    def code(self, value):
+        """Returns the code for a string, adding it if it is new."""
+        codes = self.codes
+        code = codes.setdefault(value, len(codes))
+        if code == len(self.strings):
+            self.strings.append(value)
+        return code
+
+    def add_lines(self, lines, file=""):
+        """Parses lines in the combined format and appends them. Returns the number parsed."""
+        match_line = COMBINED_LOG_REGEX.match
+        code = self.code
+        file_code = code(file)
+        ip, ts, method, path = self.ip.append, self.ts.append, self.method.append, self.path.append
+        status, size, ua, vhost = self.status.append, self.bytes.append, self.ua.append, self.vhost.append
+        file_column = self.file.append
+        parsed = 0
+        for line in lines:
+            match = match_line(line)
+            if match is None:
+                self.unparsed += 1
+                continue
+            m_ip, m_ts, m_method, m_path, m_status, m_bytes, m_ua, m_vhost = match.groups()
+            ip(code(m_ip))
+            ts(parse_timestamp(m_ts))
+            method(code(m_method or ""))
+            path(code(m_path or ""))
+            status(int(m_status))
+            size(int(m_bytes) if m_bytes != '-' else 0)
+            ua(code(m_ua))
+            vhost(code(m_vhost or ""))
+            file_column(file_code)
+            parsed += 1
+        return parsed
+
+    def row(self, index):
+        """Returns one parsed line as a dict."""
+        strings = self.strings
+        return {
+            'ip': strings[self.ip[index]], 'ts': self.ts[index], 'method': strings[self.method[index]],
+            'path': strings[self.path[index]], 'status': self.status[index], 'bytes': self.bytes[index],
+            'ua': strings[self.ua[index]], 'vhost': strings[self.vhost[index]], 'file': strings[self.file[index]],
+        }
+
+def parse_logs(source):
+    """Parses every log file in a directory or ZIP archive into LogColumns."""
+    columns = LogColumns()
+    for file, lines in open_log_files(source):
+        columns.add_lines(lines, file)
+    return columns
+
+def benchmark_parser(source, repeat=20):
+    """Times LogColumns parsing of every line in source, read repeat times, and prints lines/s."""
+    lines = [(file, list(f)) for file, f in open_log_files(source)]
+    line_count = sum(len(file_lines) for _, file_lines in lines) * repeat
+    parse_timestamp.cache_clear()
+    columns = LogColumns()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for file, file_lines in lines:
+            columns.add_lines(file_lines, file)
+    seconds = time.perf_counter() - start
+    print(f"Parsed {len(columns)} of {line_count} lines in {seconds:.2f}s "
+          f"({line_count / seconds:,.0f} lines/s), {len(columns.strings)} distinct strings")
+
+def open_log_files(source):
+    """Yields (file name, line stream) for each log file in a directory or ZIP archive.
+
+    Archive members are read through ZipFile.open, so nothing is extracted to disk and
+    only one buffer per member is held in memory.
+    """
+    if os.path.isfile(source) and zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source, 'r') as zip_ref:
+            for file_info in zip_ref.infolist():
+                file = os.path.basename(file_info.filename)
+                if file_info.is_dir() or not is_log_file(file):
+                    continue
+                with zip_ref.open(file_info) as raw:
+                    yield file, io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+        return
     # Create logs directory if it doesn't exist
-    os.makedirs(logs_dir, exist_ok=True)
+    os.makedirs(source, exist_ok=True)
+    for root, _, files in os.walk(source):
+        for file in files:
+            if is_log_file(file):
+                with open(os.path.join(root, file), 'r', encoding='utf-8', errors='replace') as f:
+                    yield file, f
+
+def load_rules(rules_file=DEFAULT_RULES_FILE):
+    """Loads suspicious-request rules from a JSON file.
+
+    Each rule has a name, a field (one of RULE_FIELDS) and one of "equals" (exact
+    value), "contains" (literal substring) or "pattern" (regular expression), plus an
+    optional "ignore_case".
+    """
+    with open(rules_file, 'r') as f:
+        rules = json.load(f)
+    for rule in rules:
+        if rule.get('field', 'line') not in RULE_FIELDS:
+            raise ValueError(f"Rule {rule.get('name')!r} has unknown field {rule['field']!r}")
+        if sum(key in rule for key in ('equals', 'contains', 'pattern')) != 1:
+            raise ValueError(f"Rule {rule.get('name')!r} needs exactly one of equals, contains or pattern")
+    return rules
+
+def literal_trie_pattern(literals):
+    """Builds a regular expression that finds any of the literals, factored into a trie.
+
+    An alternation of hundreds of literals makes the regex engine try every branch
+    at every position; the trie form checks one character class per step instead.
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        if '' in node:
+            return ''  # Any longer literal through here contains this one, so it adds nothing to a search
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return emit(trie)
+
+class RuleMatcher:
+    """Checks a log line against all rules in one pass per field.
+
+    "equals" rules are looked up in a dict per field. The "contains" rules for a field
+    are joined into one regex (literals as a trie) that is searched once; only when it
+    hits are that field's literals checked one by one to name every rule that matched.
+    Most lines hit nothing, so the cost barely grows with the number of literals.
+    "pattern" rules are searched one by one: joining them into one regex would break
+    their inline flags, group names and backreferences.
+    """
+
+    def __init__(self, rules):
+        exact = {}
+        searched = {}
+        for rule in rules:
+            field = rule.get('field', 'line')
+            ignore_case = bool(rule.get('ignore_case'))
+            if 'equals' in rule:
+                value = rule['equals'].lower() if ignore_case else rule['equals']
+                exact.setdefault((field, ignore_case), {}).setdefault(value, []).append(rule['name'])
+            elif 'contains' in rule:
+                literal = rule['contains'].lower() if ignore_case else rule['contains']
+                searched.setdefault(field, ([], []))[0].append((rule['name'], ignore_case, literal))
+            else:
+                regex = re.compile(rule['pattern'], re.IGNORECASE if ignore_case else 0)
+                searched.setdefault(field, ([], []))[1].append((rule['name'], regex))
+        self.exact = [(RULE_FIELDS[field], ignore_case, table) for (field, ignore_case), table in exact.items()]
+        self.searched = [(RULE_FIELDS[field], self.combine(literal_rules), literal_rules, pattern_rules)
+                         for field, (literal_rules, pattern_rules) in searched.items()]
+
+    @staticmethod
+    def combine(literal_rules):
+        """Compiles one regex that matches wherever any of the literals could, or returns None if there are none."""
+        parts = []
+        for ignore_case in (False, True):
+            literals = [literal for _, case, literal in literal_rules if case == ignore_case]
+            if literals:
+                trie = literal_trie_pattern(literals)
+                parts.append(f"(?i:{trie})" if ignore_case else trie)
+        return re.compile('|'.join(parts)) if parts else None
+
+    def match(self, line, groups=None):
+        """Returns the names of the rules a line matches.
+
+        groups are the COMBINED_LOG_REGEX groups of the line; if the line did not
+        parse, every rule is applied to the whole line.
+        """
+        hits = []
+        for index, combined, literal_rules, pattern_rules in self.searched:
+            value = line if index is None or groups is None else groups[index]
+            if not value:
+                continue
+            if combined is not None and combined.search(value):
+                lowered = value.lower()
+                for name, ignore_case, literal in literal_rules:
+                    if literal in (lowered if ignore_case else value):
+                        hits.append(name)
+            for name, regex in pattern_rules:
+                if regex.search(value):
+                    hits.append(name)
+        for index, ignore_case, table in self.exact:
+            if groups is None:
+                names = [name for value, names in table.items()
+                         for name in names if value in (line.lower() if ignore_case else line)]
+            else:
+                value = line if index is None else groups[index]
+                names = table.get(value.lower() if ignore_case and value else value)
+            if names:
+                hits.extend(names)
+        return hits
+
+def test_rule_matcher():
+    """Test cases for RuleMatcher."""
+    line = '1.2.3.4 - - [15/Sep:10:00:00 -0600] "GET /bb?q=UNION+ALL+SELECT HTTP/1.1" 200 5 "-" "ua" a.com \n'
+    groups = COMBINED_LOG_REGEX.match(line).groups()
+    matcher = RuleMatcher([
+        {"name": "contains", "field": "path", "contains": "union", "ignore_case": True},
+        {"name": "inline_flags", "field": "path", "pattern": "(?i)union.+select"},
+        {"name": "group_a", "field": "path", "pattern": "(?P<x>q)="},
+        {"name": "group_b", "field": "path", "pattern": "(?P<x>ALL)"},
+        {"name": "backref_a", "field": "path", "pattern": "(a)\\1"},
+        {"name": "backref_b", "field": "path", "pattern": "(b)\\1"},
+    ])
+    assert sorted(matcher.match(line, groups)) == ["backref_b", "contains", "group_a", "group_b", "inline_flags"]
+    assert matcher.match(line.replace("/bb", "/ab"), COMBINED_LOG_REGEX.match(line.replace("/bb", "/ab")).groups()) \
+        == ["contains", "inline_flags", "group_a", "group_b"]
+    assert RuleMatcher([{"name": "only_pattern", "pattern": "(b)\\1"}]).match("/bb") == ["only_pattern"]
+
+def new_scan_result():
+    """Returns an empty scan result.
+
+    It holds the (ip, file) matches, per-rule, per-IP and per-file hit counts, the
+    activity for IpIndex: [hits, first seen, last seen] per (ip, vhost, rule, day), and
+    the traffic for RateMonitor.add_counts(): [requests, first seen, last seen] per
+    (kind, name, bucket number).
+    """
+    return {'matches': set(), 'rules': Counter(), 'ips': Counter(), 'files': Counter(), 'activity': {},
+            'traffic': {}}
+
+def tally(table, key, ts):
+    """Counts one event at time ts in a {key: [count, first seen, last seen]} table."""
+    entry = table.get(key)
+    if entry is None:
+        table[key] = [1, ts, ts]
+    else:
+        entry[0] += 1
+        entry[1] = min(entry[1], ts)
+        entry[2] = max(entry[2], ts)
+
+def scan_lines(lines, file, matcher, result, bucket=None):
+    """Checks lines from one log file against the rules and adds the hits to result.
+
+    With a bucket size in seconds, every parsed line is also tallied in result['traffic']
+    per IP, vhost and IP on login pages, so request rates come from the same pass.
+    """
+    matches, rule_hits, ip_hits, file_hits = result['matches'], result['rules'], result['ips'], result['files']
+    activity, traffic = result['activity'], result['traffic']
+    match_line = COMBINED_LOG_REGEX.match
+    is_login = LOGIN_PATH_REGEX.search
+    for line in lines:
+        parsed = match_line(line)
+        groups = parsed.groups() if parsed else None
+        if bucket and groups is not None:
+            ts = parse_timestamp(groups[1])
+            if ts >= 0:
+                number = ts // bucket
+                tally(traffic, ('ip', groups[0], number), ts)
+                if groups[7]:
+                    tally(traffic, ('vhost', groups[7], number), ts)
+                if groups[3] and is_login(groups[3]):
+                    tally(traffic, ('login', groups[0], number), ts)
+        hits = matcher.match(line, groups)
+        if hits:
+            match = parsed or CSV_LOG_REGEX.match(line)
+            if match:
+                source_ip = match.group(1)
+                matches.add((source_ip, file))
+                ip_hits[source_ip] += len(hits)
+                ts = parse_timestamp(parsed.group(2)) if parsed else -1
+                vhost = (parsed.group(8) if parsed else None) or file
+                for rule in hits:
+                    tally(activity, (source_ip, vhost, rule, ts // 86400), ts)
+            rule_hits.update(hits)
+            file_hits[file] += len(hits)
+    return result
+
+def merge_scan_results(results):
+    """Merges scan results into one. Merging in the same order always gives the same result."""
+    if len(results) == 1:
+        return results[0]
+    merged = new_scan_result()
+    for result in results:
+        merged['matches'] |= result['matches']
+        for key in ('rules', 'ips', 'files'):
+            merged[key].update(result[key])
+        for table in ('activity', 'traffic'):
+            merged_table = merged[table]
+            for key, (count, first, last) in result[table].items():
+                entry = merged_table.get(key)
+                if entry is None:
+                    merged_table[key] = [count, first, last]
+                else:
+                    entry[0] += count
+                    entry[1] = min(entry[1], first)
+                    entry[2] = max(entry[2], last)
+    return merged
+
+def list_scan_parts(source, split_size=DEFAULT_SPLIT_SIZE):
+    """Lists the pieces of work for a parallel scan as (file name, path, start, end) tuples.
+
+    Files in a directory larger than split_size are split into byte ranges of about
+    that size; end is None for the whole member of an archive. Members of a ZIP archive cannot
+    be read from the middle, so each is one part and path is its name in the archive.
+    """
+    parts = []
+    if os.path.isfile(source) and zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source, 'r') as zip_ref:
+            for file_info in zip_ref.infolist():
+                file = os.path.basename(file_info.filename)
+                if not file_info.is_dir() and is_log_file(file):
+                    parts.append((file, file_info.filename, 0, None))
+        return parts
+    for root, _, files in os.walk(source):
+        for file in files:
+            if is_log_file(file):
+                path = os.path.join(root, file)
+                parts.extend(split_range(file, path, 0, os.path.getsize(path), split_size))
+    return parts
+
+def split_range(file, path, start, end, split_size):
+    """Splits the byte range start-end of a file into parts of about split_size."""
+    starts = range(start, end, split_size) if end - start > split_size else [start]
+    return [(file, path, part_start, min(part_start + split_size, end)) for part_start in starts]
+
+def load_checkpoints(checkpoint_file):
+    """Loads the checkpoint store: {path: {"device", "inode", "offset"}} for each log file.
+
+    Returns an empty store if the file does not exist yet.
+    """
+    try:
+        with open(checkpoint_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_checkpoints(checkpoint_file, checkpoints):
+    """Writes the checkpoint store through a temporary file, so a crash never leaves half of one."""
+    temp_file = checkpoint_file + ".tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(checkpoints, f, indent=2)
+    os.replace(temp_file, checkpoint_file)
+
+def complete_size(path, size, block_size=65536):
+    """Returns how many bytes of a file end in a newline; a line still being written is left out."""
+    with open(path, 'rb') as f:
+        end = size
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline != -1:
+                return start + newline + 1
+            end = start
+    return 0
+
+def list_new_parts(logs_dir, checkpoints, split_size=DEFAULT_SPLIT_SIZE):
+    """Lists the parts of the log files in logs_dir that were added since the checkpoints.
+
+    Files are known by device and inode rather than name, so a log that was rotated
+    (renamed to candy_store.com.1) still has its last lines read from where the previous
+    run stopped, and the new file under the old name is read from the start. A file
+    that shrank was truncated in place and is read again from the start.
+
+    Returns the parts, as in list_scan_parts(), and the checkpoints to save once they
+    have been scanned: the stored ones updated with the files read now.
+    """
+    if os.path.isfile(logs_dir):
+        raise ValueError(f"{logs_dir} is not a directory; only live log directories can be tailed")
+    offsets = {(entry['device'], entry['inode']): entry['offset'] for entry in checkpoints.values()}
+    parts = []
+    new_checkpoints = dict(checkpoints)
     for root, _, files in os.walk(logs_dir):
         for file in files:
-            if file.endswith(".log"):
-                with open(os.path.join(root, file), 'r') as f:
-                    lines = f.readlines()
-                    for line in lines:
-                        if re.search(r'\.\./|/wp-login\.php\?action=register|403|install|select', line):
-                            match = re.search(r'^([\d.]+),', line)
-                            if match:
-                                source_ip = match.group(1)
-                                matches.add((source_ip, file))
+            if not is_log_file(file):
+                continue
+            path = os.path.join(root, file)
+            stat = os.stat(path)
+            start = offsets.get((stat.st_dev, stat.st_ino), 0)
+            if start > stat.st_size:
+                start = 0
+            end = complete_size(path, stat.st_size) if stat.st_size > start else start
+            if end > start:
+                parts.extend(split_range(file, path, start, end, split_size))
+            new_checkpoints[os.path.relpath(path, logs_dir)] = {
+                'device': stat.st_dev, 'inode': stat.st_ino, 'offset': end}
+    return parts, new_checkpoints
+
+def tail_state_dir(state_root, logs_dir):
+    """Returns the folder under state_root for the matches, counts and checkpoints of tailing logs_dir.
+
+    Each tailed directory gets its own folder, named after it and a hash of its real path,
+    so tailing another directory or running the batch pipeline never touches its state.
+    """
+    real_path = os.path.realpath(logs_dir)
+    name = os.path.basename(real_path) or "root"
+    return os.path.join(state_root, f"{name}-{hashlib.sha256(real_path.encode()).hexdigest()[:12]}")
+
+def read_part(source, part):
+    """Yields the lines of one part from list_scan_parts().
+
+    A part owns every line that starts inside its byte range, so splitting a file
+    anywhere neither drops nor repeats a line.
+    """
+    file, path, start, end = part
+    if os.path.isfile(source) and zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source, 'r') as zip_ref, zip_ref.open(path) as raw:
+            yield from io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+        return
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # Skip the rest of the line that started in the previous part
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8', errors='replace')
+
+# Each worker process builds its RuleMatcher once, in init_scan_worker()
+_worker_matcher = None
+_worker_bucket = None
+
+def init_scan_worker(rules, bucket=None):
+    """Sets up a worker process for scan_part()."""
+    global _worker_matcher, _worker_bucket
+    _worker_matcher = RuleMatcher(rules)
+    _worker_bucket = bucket
+
+def scan_part(source, part, matcher=None, bucket=None):
+    """Scans one part and returns its scan result. Worker processes use their own matcher and bucket size."""
+    if matcher is None:
+        matcher, bucket = _worker_matcher, _worker_bucket
+    return scan_lines(read_part(source, part), part[0], matcher, new_scan_result(), bucket)
+
+def load_scan_result(output_file, counts_file):
+    """Reads the matches and hit counts written by an earlier run, if there are any."""
+    result = new_scan_result()
+    if os.path.exists(output_file):
+        with open(output_file, 'r') as f:
+            result['matches'].update(tuple(line.rstrip('\n').split(',', 1)) for line in f if line.strip())
+    if counts_file and os.path.exists(counts_file):
+        with open(counts_file, 'r') as f:
+            counts = json.load(f)
+        for key in ('rules', 'ips', 'files'):
+            result[key].update(counts.get(key, {}))
+    return result
+
+class IpIndex:
+    """Persistent SQLite index of rule hits per IP, vhost, rule and day.
+
+    Each row keeps the hit count and the first and last time the IP was seen breaking
+    that rule on that vhost that day, so questions about one IP are answered from the
+    index without rescanning the logs. The primary key starts with the IP, so a lookup
+    only reads that IP's rows.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS activity (
+                ip TEXT NOT NULL, vhost TEXT NOT NULL, rule TEXT NOT NULL, day INTEGER NOT NULL,
+                hits INTEGER NOT NULL, first_seen INTEGER NOT NULL, last_seen INTEGER NOT NULL,
+                PRIMARY KEY (ip, vhost, rule, day)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sources (key TEXT PRIMARY KEY, added INTEGER NOT NULL);
+        """)
+
+    def add(self, activity, source=None):
+        """Adds the activity of a scan result to the index in one transaction.
+
+        source identifies what was scanned (see source_key()); a source that is already
+        in the index is skipped, so scanning the same logs again does not count them
+        twice. Returns whether the activity was added.
+        """
+        with self.db:
+            if source is not None:
+                if self.db.execute("SELECT 1 FROM sources WHERE key = ?", (source,)).fetchone():
+                    return False
+                self.db.execute("INSERT INTO sources VALUES (?, ?)", (source, int(time.time())))
+            self.db.executemany("""
+                INSERT INTO activity VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ip, vhost, rule, day) DO UPDATE SET
+                    hits = hits + excluded.hits,
+                    first_seen = min(first_seen, excluded.first_seen),
+                    last_seen = max(last_seen, excluded.last_seen)
+            """, [(ip, vhost, rule, day, hits, first, last)
+                  for (ip, vhost, rule, day), (hits, first, last) in activity.items()])
+        return True
+
+    def lookup(self, ip, since=None):
+        """Returns (vhost, rule, hits, first seen, last seen) for an IP, optionally only since a time."""
+        return self.db.execute("""
+            SELECT vhost, rule, sum(hits), min(first_seen), max(last_seen) FROM activity
+            WHERE ip = ? AND last_seen >= ? GROUP BY vhost, rule ORDER BY vhost, sum(hits) DESC, rule
+        """, (ip, since if since is not None else -1)).fetchall()
+
+    def latest(self):
+        """Returns the last time any IP was seen in the index, or None if it is empty."""
+        return self.db.execute("SELECT max(last_seen) FROM activity").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+def source_key(logs_dir):
+    """Identifies the current contents of a log archive or directory by name, size and modification time."""
+    if os.path.isfile(logs_dir):
+        stat = os.stat(logs_dir)
+        return f"{os.path.realpath(logs_dir)}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha256(os.path.realpath(logs_dir).encode())
+    for root, _, files in sorted(os.walk(logs_dir)):
+        for file in sorted(files):
+            if is_log_file(file):
+                stat = os.stat(os.path.join(root, file))
+                digest.update(f"{os.path.join(root, file)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+class IpRanges:
+    """Looks up the owner, country and crawler of IPv4 addresses in a local table of networks.
+
+    The table is a CSV file with network (CIDR), owner, country and crawler columns.
+    Network starts and ends are kept in sorted arrays and searched with bisect; a
+    network inside a bigger one (a crawler range inside its cloud provider) wins,
+    and each network points to the one around it for addresses outside it.
+    Recent lookups are cached, since log IPs repeat.
+    """
+
+    def __init__(self, ranges_file=DEFAULT_IP_RANGES_FILE, cache_size=65536):
+        networks = []
+        with open(ranges_file, newline='') as f:
+            for row in csv.DictReader(f):
+                network = ipaddress.ip_network(row['network'].strip(), strict=False)
+                if network.version == 4:
+                    networks.append((int(network.network_address), int(network.broadcast_address),
+                                     (row['owner'], row['country'], row.get('crawler') or None)))
+        networks.sort(key=lambda network: (network[0], -network[1]))
+        self.starts = array('I', (start for start, _, _ in networks))
+        self.ends = array('I', (end for _, end, _ in networks))
+        self.tags = [tags for _, _, tags in networks]
+        # parents[i] is the closest earlier network that contains network i, or -1
+        self.parents = array('i')
+        around = []
+        for start, end, _ in networks:
+            while around and self.ends[around[-1]] < start:
+                around.pop()
+            self.parents.append(around[-1] if around else -1)
+            around.append(len(self.parents) - 1)
+        self.lookup = lru_cache(maxsize=cache_size)(self.find)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find(self, ip):
+        """Returns (owner, country, crawler) for an IPv4 address, or None if no network holds it."""
+        try:
+            address = int.from_bytes(socket.inet_aton(ip), 'big')
+        except OSError:
+            return None
+        index = bisect.bisect_right(self.starts, address) - 1
+        while index >= 0 and self.ends[index] < address:
+            index = self.parents[index]
+        return self.tags[index] if index >= 0 else None
+
+def enrich_matches(matches_file, ranges, output_file):
+    """Writes matches.txt as a CSV with the owner, country and crawler of each IP.
+
+    Returns the number of matches from known crawlers.
+    """
+    crawlers = 0
+    with open(matches_file, 'r') as f, open(output_file, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(['ip', 'file', 'owner', 'country', 'crawler'])
+        for line in f:
+            if not line.strip():
+                continue
+            ip, file = line.rstrip('\n').split(',', 1)
+            owner, country, crawler = ranges.lookup(ip) or ('', '', None)
+            crawlers += crawler is not None
+            writer.writerow([ip, file, owner, country, crawler or ''])
+    return crawlers
+
+def print_ip_activity(index, ip, days=None, ranges=None):
+    """Prints what an IP did, per vhost and rule, from the index.
+
+    days counts back from the newest time in the index rather than from now, since the
+    sample logs have no year and are stored as DEFAULT_YEAR.
+    """
+    latest = index.latest() if days is not None else None
+    since = latest - days * 86400 if latest is not None else None
+    rows = index.lookup(ip, since)
+    tags = ranges.lookup(ip) if ranges is not None else None
+    if tags:
+        owner, country, crawler = tags
+        print(f"{ip}: {owner}, {country}" + (f", known crawler ({crawler})" if crawler else ""))
+    if not rows:
+        print(f"No hits from {ip}")
+        return
+
+    def when(ts):
+        if ts < 0:
+            return "unknown"
+        stamp = time.gmtime(ts)
+        # Timestamps without a year are stored as DEFAULT_YEAR, so leave the year out of those
+        return time.strftime('%d/%b %H:%M:%S' if stamp.tm_year == DEFAULT_YEAR else '%Y-%m-%d %H:%M:%S', stamp)
+
+    for vhost, rule, hits, first, last in rows:
+        print(f"{ip} {vhost} {rule}: {hits} hits, first {when(first)}, last {when(last)} UTC")
+
+class RateMonitor:
+    """Counts requests per IP, per vhost and per IP on login pages in sliding time windows.
+
+    Each key keeps a ring of window / bucket counters, so its memory is fixed, and keys
+    that have been idle for a whole window are dropped. When a key's window reaches the
+    threshold for its kind a burst starts; it grows while the key stays over the
+    threshold and is closed once the key goes quiet.
+
+    Requests arrive already counted per bucket (see scan_lines()) and are replayed in
+    time order, so logs can be scanned in any order or in parallel. A burst starts at the
+    first request of the bucket in which its window reached the threshold.
+    """
+
+    def __init__(self, window=BURST_WINDOW_SECONDS, bucket=BURST_BUCKET_SECONDS, thresholds=None):
+        self.bucket = bucket
+        self.slots = -(-window // bucket)
+        self.window = self.slots * bucket
+        self.thresholds = dict(BURST_THRESHOLDS, **(thresholds or {}))
+        self.windows = {}  # (kind, name) -> [bucket numbers, counts], one entry per slot
+        self.open_bursts = {}  # (kind, name) -> burst dict
+        self.bursts = []
+        self.latest = None
+
+    def add_counts(self, traffic):
+        """Counts the requests in a scan result's traffic table, bucket by bucket in time order.
+
+        traffic is {(kind, name, bucket number): [requests, first seen, last seen]}, with
+        bucket numbers in units of self.bucket seconds since the epoch. Keys with fewer
+        requests in total than their threshold, and no window from earlier counts, can
+        never start a burst, so they are skipped.
+        """
+        totals = Counter()
+        for (kind, name, _), (requests, _, _) in traffic.items():
+            totals[kind, name] += requests
+        busy = {key for key, total in totals.items() if total >= self.thresholds[key[0]] or key in self.windows}
+        items = [item for item in traffic.items() if item[0][:2] in busy]
+        for (kind, name, bucket), (requests, first, last) in sorted(items, key=lambda item: (item[0][2], item[1][1])):
+            if self.latest is None or bucket >= self.latest + self.slots:
+                if self.latest is not None:
+                    self.evict(bucket)
+                self.latest = bucket
+            self.count((kind, name), bucket, first, last, requests)
+
+    def count(self, key, bucket, first, last, requests=1):
+        """Adds requests seen from first to last to a key's window and checks it against the threshold."""
+        ring = self.windows.get(key)
+        if ring is None:
+            ring = self.windows[key] = [[-1] * self.slots, [0] * self.slots]
+        numbers, counts = ring
+        slot = bucket % self.slots
+        if numbers[slot] != bucket:
+            if numbers[slot] > bucket:
+                return  # Older than the window this key has moved on to
+            numbers[slot] = bucket
+            counts[slot] = 0
+        counts[slot] += requests
+        oldest = bucket - self.slots
+        total = sum(count for number, count in zip(numbers, counts) if number > oldest)
+        if total < self.thresholds[key[0]]:
+            return
+        burst = self.open_bursts.get(key)
+        if burst is not None and first > burst['end'] + self.window:
+            self.bursts.append(self.open_bursts.pop(key))
+            burst = None
+        if burst is None:
+            self.open_bursts[key] = {'kind': key[0], 'name': key[1], 'start': first, 'end': last, 'peak': total}
+        else:
+            burst['start'] = min(burst['start'], first)
+            burst['end'] = max(burst['end'], last)
+            burst['peak'] = max(burst['peak'], total)
+
+    def evict(self, bucket):
+        """Drops the windows, and closes the bursts, of keys with nothing in the window ending at bucket."""
+        oldest = bucket - self.slots
+        idle = [key for key, (numbers, _) in self.windows.items() if max(numbers) <= oldest]
+        for key in idle:
+            del self.windows[key]
+            if key in self.open_bursts:
+                self.bursts.append(self.open_bursts.pop(key))
+
+    def report(self):
+        """Returns every burst, busiest first, with its peak in requests per window."""
+        bursts = self.bursts + list(self.open_bursts.values())
+        return sorted(bursts, key=lambda burst: (-burst['peak'], burst['start'], burst['kind'], burst['name']))
+
+def load_rate_state(state_file, monitor):
+    """Restores a RateMonitor's windows and bursts saved by save_rate_state(), if there are any.
+
+    Windows saved with a different bucket or window size are dropped and their open
+    bursts closed; the closed bursts are kept either way.
+    """
+    try:
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return monitor
+    monitor.bursts = state['bursts']
+    if (state['bucket'], state['slots']) != (monitor.bucket, monitor.slots):
+        monitor.bursts.extend(state['open_bursts'])
+        return monitor
+    monitor.latest = state['latest']
+    monitor.windows = {(kind, name): [numbers, counts] for kind, name, numbers, counts in state['windows']}
+    monitor.open_bursts = {(burst['kind'], burst['name']): burst for burst in state['open_bursts']}
+    return monitor
+
+def save_rate_state(state_file, monitor):
+    """Writes a RateMonitor's windows and bursts through a temporary file, like save_checkpoints()."""
+    state = {'bucket': monitor.bucket, 'slots': monitor.slots, 'latest': monitor.latest,
+             'windows': [[kind, name, numbers, counts] for (kind, name), (numbers, counts) in monitor.windows.items()],
+             'open_bursts': list(monitor.open_bursts.values()), 'bursts': monitor.bursts}
+    temp_file = state_file + ".tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(state, f)
+    os.replace(temp_file, state_file)
+
+class SpaceSaving:
+    """Space-Saving top-k counter: the most frequent items of a stream in fixed memory.
+
+    At most capacity items are tracked. When a new item arrives and all counters are
+    taken, it replaces an item with the lowest count and inherits that count as its
+    error. A reported count is never below the true count and at most error above
+    it, and error is never more than total / capacity.
+
+    Counters are grouped by count (the "stream summary"), so every update is O(1).
+    """
+
+    def __init__(self, capacity=DEFAULT_SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.items = {}  # item -> [count, error]
+        self.by_count = {}  # count -> {item: None}, in insertion order
+        self.min_count = 0
+        self.total = 0
+
+    def add(self, item):
+        self.total += 1
+        entry = self.items.get(item)
+        if entry is None:
+            if len(self.items) < self.capacity:
+                entry = self.items[item] = [0, 0]
+                self.min_count = 0
+            else:
+                victims = self.by_count[self.min_count]
+                victim = next(iter(victims))
+                self.unlink(victim, self.min_count)
+                del self.items[victim]
+                entry = self.items[item] = [self.min_count, self.min_count]
+        else:
+            self.unlink(item, entry[0])
+        entry[0] += 1
+        self.by_count.setdefault(entry[0], {})[item] = None
+        if self.min_count not in self.by_count:
+            self.min_count = min(self.min_count + 1, entry[0])
+
+    def unlink(self, item, count):
+        bucket = self.by_count[count]
+        del bucket[item]
+        if not bucket:
+            del self.by_count[count]
+
+    def top(self, n):
+        """Returns up to n (item, count, error) tuples, most frequent first."""
+        ranked = sorted(self.items.items(), key=lambda entry: (-entry[1][0], entry[1][1]))[:n]
+        return [(item, count, error) for item, (count, error) in ranked]
+
+class HyperLogLog:
+    """Estimates the number of distinct items in a stream using 2**precision bytes.
+
+    The standard error of the estimate is about 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self.rank_bits = 64 - precision
+
+    @property
+    def relative_error(self):
+        return 1.04 / (len(self.registers) ** 0.5)
+
+    def add(self, item):
+        value = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), 'big')
+        register = value >> self.rank_bits
+        rank = self.rank_bits - (value & ((1 << self.rank_bits) - 1)).bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def count(self):
+        registers = self.registers
+        m = len(registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -register for register in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))  # Linear counting is more accurate for small counts
+        return round(estimate)
+
+class TrafficSketch:
+    """Top IPs, paths and user agents and the number of distinct IPs per vhost, in fixed memory."""
+
+    def __init__(self, capacity=DEFAULT_SKETCH_CAPACITY, precision=DEFAULT_HLL_PRECISION):
+        self.capacity = capacity
+        self.precision = precision
+        self.vhosts = {}
+
+    def add(self, ip, vhost, path, ua):
+        sketch = self.vhosts.get(vhost)
+        if sketch is None:
+            sketch = self.vhosts[vhost] = {
+                'ips': SpaceSaving(self.capacity), 'paths': SpaceSaving(self.capacity),
+                'uas': SpaceSaving(self.capacity), 'distinct_ips': HyperLogLog(self.precision)}
+        sketch['ips'].add(ip)
+        sketch['paths'].add(path)
+        sketch['uas'].add(ua)
+        sketch['distinct_ips'].add(ip)
+
+    def report(self, top_n=10):
+        """Returns the top_n of each list per vhost, with the error bounds of every number."""
+        report = {}
+        for vhost, sketch in sorted(self.vhosts.items()):
+            distinct = sketch['distinct_ips']
+            lines = sketch['ips'].total
+            report[vhost] = {
+                'lines': lines,
+                'distinct_ips': distinct.count(),
+                'distinct_ips_relative_error': round(distinct.relative_error, 4),
+                'max_count_error': lines // self.capacity,
+            }
+            for key in ('ips', 'paths', 'uas'):
+                report[vhost][f"top_{key}"] = [{'value': item, 'count': count, 'error': error}
+                                               for item, count, error in sketch[key].top(top_n)]
+        return report
+
+def aggregate_traffic(source, sketch):
+    """Feeds every parsed line of the logs in a directory or ZIP archive to a TrafficSketch.
+
+    Request rates are counted while the rules are scanned (see process_logs()); this
+    second pass over the logs only runs when a sketch is asked for.
+    """
+    match_line = COMBINED_LOG_REGEX.match
+    for file, lines in open_log_files(source):
+        for line in lines:
+            parsed = match_line(line)
+            if parsed:
+                ip, _, _, path, _, _, ua, vhost = parsed.groups()
+                sketch.add(ip, vhost or file, path or "", ua)
+
+def write_traffic_sketch(report, sketch_file):
+    """Writes a TrafficSketch report to a JSON file and prints the top of each list."""
+    for vhost, summary in report.items():
+        print(f"{vhost}: {summary['lines']} lines, ~{summary['distinct_ips']} distinct IPs "
+              f"(+/-{summary['distinct_ips_relative_error']:.1%}), counts within {summary['max_count_error']}")
+        for key in ('ips', 'paths', 'uas'):
+            top = ", ".join(f"{entry['value']} ({entry['count']})" for entry in summary[f"top_{key}"][:3])
+            print(f"  top {key}: {top}")
+    with open(sketch_file, 'w') as f:
+        json.dump(report, f, indent=2)
+
+def write_rate_alerts(bursts, alerts_file, window, printed=None):
+    """Writes bursts to a JSON file and prints one line per burst, or per burst in printed if given."""
+    for burst in bursts if printed is None else printed:
+        start = time.strftime('%d/%b %H:%M:%S', time.gmtime(burst['start']))
+        end = time.strftime('%H:%M:%S', time.gmtime(burst['end']))
+        print(f"Burst: {burst['kind']} {burst['name']} peaked at {burst['peak']} requests/{window}s "
+              f"({start} to {end} UTC)")
+    with open(alerts_file, 'w') as f:
+        json.dump(bursts, f, indent=2)
+
+def process_logs(logs_dir, output_file, rules=None, counts_file=None, workers=1, split_size=DEFAULT_SPLIT_SIZE,
+                 checkpoint_file=None, index=None, monitor=None):
+    """Processes log files and logs matches.
+
+    logs_dir can be a directory of log files or a ZIP archive of them. Lines are
+    read one at a time, so memory does not grow with the size of the logs. Every
+    line is checked against the rules (from DEFAULT_RULES_FILE if not given), and
+    per-rule, per-IP and per-file hit counts are returned and, if counts_file is
+    given, written to it as JSON.
+
+    With more than one worker, files (and pieces of large files, see
+    list_scan_parts()) are scanned in a process pool and the partial results are
+    merged in file order, so the output is the same as a single-process run.
+
+    With a checkpoint_file, logs_dir is a directory of live logs and only the lines
+    added since the last run are scanned (see list_new_parts()); their hits are added
+    to the matches and counts already in output_file and counts_file.
+
+    If an IpIndex is given, the hits are added to it too. A full scan is only added
+    once per version of logs_dir; tailed lines are always new.
+
+    If a RateMonitor is given, every scanned line is counted in it too, in the same pass.
+    """
+    rules = rules if rules is not None else load_rules()
+    bucket = monitor.bucket if monitor is not None else None
+    source = source_key(logs_dir) if index is not None and not checkpoint_file else None
+    results = []
+    if checkpoint_file:
+        results.append(load_scan_result(output_file, counts_file))
+        parts, checkpoints = list_new_parts(logs_dir, load_checkpoints(checkpoint_file), split_size)
+    elif workers > 1:
+        parts = list_scan_parts(logs_dir, split_size)
+    else:
+        parts = None
+    if parts is None:
+        matcher = RuleMatcher(rules)
+        result = new_scan_result()
+        for file, lines in open_log_files(logs_dir):
+            scan_lines(lines, file, matcher, result, bucket)
+        results.append(result)
+    elif workers > 1 and len(parts) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_scan_worker,
+                                 initargs=(rules, bucket)) as pool:
+            results.extend(pool.map(scan_part, [logs_dir] * len(parts), parts))
+    else:
+        matcher = RuleMatcher(rules)
+        results.extend(scan_part(logs_dir, part, matcher, bucket) for part in parts)
+    result = merge_scan_results(results)
+    if monitor is not None:
+        monitor.add_counts(result['traffic'])
     with open(output_file, 'w') as f:
-        for ip, filename in matches:
+        for ip, filename in sorted(result['matches']):
             f.write(f"{ip},{filename}\n")
+    counts = {key: dict(result[key].most_common()) for key in ('rules', 'ips', 'files')}
+    if counts_file:
+        with open(counts_file, 'w') as f:
+            json.dump(counts, f, indent=2)
+    if index is not None:
+        index.add(result['activity'], source)
+    if checkpoint_file:
+        # Saved last, so a run that fails part way scans the same lines again rather than skipping them
+        save_checkpoints(checkpoint_file, checkpoints)
+    return counts
 
 def rename_files(logs_dir):
     """Renames log files."""
     for root, _, files in os.walk(logs_dir):
         for file in files:
-            if file.endswith(".log"):
+            if is_log_file(file):
                 old_path = os.path.join(root, file)
                 new_path = os.path.join(root, f"processed_{file}")
                 os.rename(old_path, new_path)
@@ -47,11 +1121,318 @@ def delete_unmatched(logs_dir):
             if not os.listdir(dir_path):
                 send2trash(dir_path)
 
-def zip_logs(logs_dir, zip_file):
+def deflate_file(path, level, chunk_size=1024 * 1024):
+    """Compresses a file into a raw deflate stream. Returns (spooled stream, CRC-32, size)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    spool = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_SIZE)
+    crc = size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            spool.write(compressor.compress(chunk))
+    spool.write(compressor.flush())
+    return spool, crc, size
+
+class ResultsArchiver:
+    """Writes files into a ZIP archive as they are added, compressing them in parallel.
+
+    Each added file starts compressing at once in a thread pool (zlib releases the
+    GIL), and finished members are written in the order they were added. Files that
+    are compressed already (STORED_EXTENSIONS) are stored as they are. The archive is
+    built under a temporary name and moved into place on close(). At most max_pending
+    members (twice the threads by default) wait to be written, each in a spool of up to
+    ZIP_SPOOL_SIZE in memory; add() blocks on the oldest one beyond that, so memory does
+    not grow with the size of the tree.
+    Writing members that were deflated in the pool needs zipfile internals; on Python
+    versions outside RAW_ZIP_WRITE_VERSIONS each member is deflated by ZipFile.write()
+    as it is written instead, one at a time.
+    """
+
+    def __init__(self, zip_file, level=DEFAULT_ZIP_LEVEL, threads=None, max_pending=None):
+        self.zip_file = zip_file
+        self.temp_file = zip_file + ".tmp"
+        self.level = level
+        self.zip = zipfile.ZipFile(self.temp_file, 'w', zipfile.ZIP_DEFLATED, compresslevel=level)
+        threads = threads or os.cpu_count()
+        self.pool = ThreadPoolExecutor(threads)
+        self.pending = deque()
+        self.max_pending = max_pending or 2 * threads
+        self.names = set()
+        self.raw_writes = (RAW_ZIP_WRITE_VERSIONS[0] <= sys.version_info[:2] < RAW_ZIP_WRITE_VERSIONS[1]
+                           and all(hasattr(self.zip, name) for name in ZIPFILE_INTERNALS))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, path, arcname):
+        """Adds a file or directory entry to the archive."""
+        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+        self.names.add(zinfo.filename)
+        stored = zinfo.is_dir() or self.level == 0 or os.path.splitext(path)[1].lower() in STORED_EXTENSIONS
+        if stored or not self.raw_writes:
+            future = None
+        else:
+            future = self.pool.submit(deflate_file, path, self.level)
+        self.pending.append((zinfo, path, stored, future))
+        self.write_ready()
+
+    def add_tree(self, directory):
+        """Adds everything in a directory that is not in the archive yet, named relative to it.
+
+        Working files (NON_LOG_FILES) such as ip_index.db are skipped unless they were added already.
+        """
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in dirs + sorted(files):
+                path = os.path.join(root, name)
+                if name in NON_LOG_FILES and os.path.isfile(path):
+                    continue
+                arcname = os.path.relpath(path, directory)
+                if os.path.isdir(path):
+                    arcname += '/'
+                if arcname.replace(os.sep, '/') not in self.names:
+                    self.add(path, arcname)
+
+    def write_ready(self, wait=False):
+        """Writes the members at the front of the queue whose compression has finished.
+
+        With wait, waits for every member; otherwise only while more than max_pending are queued.
+        """
+        while self.pending:
+            zinfo, path, stored, future = self.pending[0]
+            if future is not None and not (wait or future.done() or len(self.pending) > self.max_pending):
+                break
+            self.pending.popleft()
+            if future is None:
+                self.zip.write(path, zinfo.filename, zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+            else:
+                spool, crc, size = future.result()
+                with spool:
+                    self.write_deflated(zinfo, spool, crc, size)
+
+    def write_deflated(self, zinfo, spool, crc, size):
+        """Writes a member that was deflated already.
+
+        zipfile can only compress members itself, so the local header and data are
+        written here the way ZipFile._open_to_write() does, and close() adds the member
+        to the central directory. Only used when self.raw_writes is set.
+        """
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo.CRC = crc
+        zinfo.file_size = size
+        zinfo.compress_size = spool.tell()
+        archive = self.zip
+        with archive._lock:
+            if archive._writing:
+                raise ValueError("Can't write to ZIP archive while an open writing handle exists.")
+            archive.fp.seek(archive.start_dir)
+            zinfo.header_offset = archive.fp.tell()
+            archive._writecheck(zinfo)
+            archive._didModify = True
+            archive.fp.write(zinfo.FileHeader())
+            spool.seek(0)
+            shutil.copyfileobj(spool, archive.fp, 1024 * 1024)
+            archive.start_dir = archive.fp.tell()
+            archive.filelist.append(zinfo)
+            archive.NameToInfo[zinfo.filename] = zinfo
+
+    def close(self):
+        """Writes the remaining members and moves the finished archive into place."""
+        self.write_ready(wait=True)
+        self.pool.shutdown()
+        self.zip.close()
+        os.replace(self.temp_file, self.zip_file)
+
+    def abort(self):
+        """Stops without touching the existing archive."""
+        self.pool.shutdown(cancel_futures=True)
+        self.zip.close()
+        os.remove(self.temp_file)
+
+def zip_logs(logs_dir, zip_file, level=DEFAULT_ZIP_LEVEL):
     """Zips up log files."""
-    shutil.make_archive(os.path.splitext(zip_file)[0], 'zip', logs_dir)
+    with ResultsArchiver(zip_file, level) as archiver:
+        archiver.add_tree(logs_dir)
+
+def parse_vhost_mix(text):
+    """Parses a vhost mix such as "a.com=3,b.org=1" into {vhost: weight}."""
+    mix = {}
+    for item in text.split(','):
+        vhost, _, weight = item.strip().partition('=')
+        mix[vhost] = float(weight) if weight else 1.0
+    return mix
+
+def write_synthetic_log(f, vhost, size, attack_rate, rng, batch_lines=10000):
+    """Writes combined-format lines for one vhost to a binary file, stopping at the line that reaches size bytes.
+
+    Returns (lines, bytes) written.
+    """
+    clients = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+               for _ in range(2000)]
+    attackers = clients[:20]
+    crawlers = [(f"{prefix}{rng.randint(1, 254)}", ua) for prefix, ua in GENERATOR_CRAWLERS for _ in range(5)]
+    referrers = ["-", "-", f"http://{vhost}/", f"http://www.{vhost}/"]
+    # One day of traffic, spread evenly over the lines
+    step = 86400 / max(1, size // 250)
+    ts = float(GENERATOR_START)
+    stamps = {}
+    written = lines = 0
+    while written < size:
+        batch = []
+        batch_size = 0
+        for _ in range(batch_lines):
+            ts += step
+            second = int(ts)
+            stamp = stamps.get(second)
+            if stamp is None:
+                stamps.clear()
+                stamp = stamps[second] = time.strftime('%d/%b:%H:%M:%S -0600',
+                                                       time.gmtime(second + GENERATOR_UTC_OFFSET))
+            roll = rng.random()
+            if roll < attack_rate:
+                method, path, status = rng.choice(GENERATOR_ATTACKS)
+                ip, ua, referrer = rng.choice(attackers), GENERATOR_USER_AGENTS[0], "-"
+            elif roll < attack_rate + 0.1:
+                (ip, ua), method, path, status, referrer = rng.choice(crawlers), "GET", rng.choice(GENERATOR_PATHS), 200, "-"
+            else:
+                ip, ua, method = rng.choice(clients), rng.choice(GENERATOR_USER_AGENTS), "GET"
+                path, status, referrer = rng.choice(GENERATOR_PATHS), rng.choice(GENERATOR_STATUSES), rng.choice(referrers)
+            size_field = rng.randint(100, 60000) if status == 200 else "-"
+            line = f'{ip} - - [{stamp}] "{method} {path} HTTP/1.1" {status} {size_field} "{referrer}" "{ua}" {vhost} \n'
+            batch.append(line)
+            batch_size += len(line)
+            if written + batch_size >= size:
+                break
+        data = ''.join(batch).encode()
+        f.write(data)
+        written += len(data)
+        lines += len(batch)
+    return lines, written
+
+def generate_logs(output, size_mb, vhost_mix=None, attack_rate=0.01, seed=0):
+    """Writes synthetic access logs of about size_mb megabytes in total.
+
+    Each vhost gets its share of the size by weight in vhost_mix, as
+    access_logs/<vhost>/<vhost> like the sample logs. attack_rate is the fraction of
+    lines that are requests the default rules catch. output is a ZIP archive if it
+    ends in .zip (written as a stream, so tens of GB need no extra disk) and a
+    directory otherwise. Returns (lines, bytes).
+    """
+    vhost_mix = vhost_mix or GENERATOR_VHOST_MIX
+    rng = random.Random(seed)
+    total_weight = sum(vhost_mix.values())
+    total_lines = total_bytes = 0
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    archive = zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) if output.endswith('.zip') else None
+    try:
+        for vhost, weight in vhost_mix.items():
+            size = int(size_mb * 1024 * 1024 * weight / total_weight)
+            name = f"access_logs/{vhost}/{vhost}"
+            if archive is not None:
+                f = archive.open(name, 'w', force_zip64=True)
+            else:
+                os.makedirs(os.path.join(output, os.path.dirname(name)), exist_ok=True)
+                f = open(os.path.join(output, name), 'wb')
+            with f:
+                lines, written = write_synthetic_log(f, vhost, size, attack_rate, rng)
+            total_lines += lines
+            total_bytes += written
+    finally:
+        if archive is not None:
+            archive.close()
+    return total_lines, total_bytes
+
+def benchmark_pipeline(source, work_dir=None, workers=1, level=DEFAULT_ZIP_LEVEL, history_file=None):
+    """Runs every pipeline stage on a log archive in a scratch folder and prints its throughput.
+
+    Throughput is the uncompressed size of the logs over each stage's time. If
+    history_file is given, the result is appended to it as one JSON line so stages
+    can be compared over time.
+    """
+    with zipfile.ZipFile(source) as zip_ref:
+        size = sum(info.file_size for info in zip_ref.infolist())
+    stages = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as scratch:
+        logs_dir = os.path.join(scratch, "logs")
+        os.makedirs(logs_dir)
+        steps = [
+            ('scan', lambda: process_logs(source, os.path.join(logs_dir, "matches.txt"), None,
+                                          os.path.join(logs_dir, "hit_counts.json"), workers,
+                                          monitor=RateMonitor())),
+            ('extract', lambda: extract_zip(source, logs_dir)),
+            ('rename', lambda: rename_files(logs_dir)),
+            ('delete', lambda: delete_unmatched(logs_dir)),
+            ('zip', lambda: zip_logs(logs_dir, os.path.join(scratch, "results.zip"), level)),
+        ]
+        for stage, step in steps:
+            start = time.perf_counter()
+            step()
+            stages[stage] = time.perf_counter() - start
+    print(f"{source}: {size / 1e6:,.1f} MB of logs, {workers} worker(s), zip level {level}")
+    for stage, seconds in stages.items():
+        print(f"  {stage:<8} {seconds:8.2f}s {size / 1e6 / seconds if seconds else float('inf'):10,.1f} MB/s")
+    if history_file:
+        with open(history_file, 'a') as f:
+            f.write(json.dumps({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'source': source, 'bytes': size,
+                                'workers': workers, 'zip_level': level, 'seconds': stages}) + "\n")
+    return stages
+
+def main(script_path, argv=None):
+    parser = argparse.ArgumentParser(description="Process the access logs in text_files/access_logs.zip.")
+    parser.add_argument("--benchmark-parser", type=int, metavar="REPEAT",
+                        help="Time the log parser over the access logs read REPEAT times, then exit.")
+    parser.add_argument("--generate", metavar="OUTPUT",
+                        help="Write synthetic access logs to OUTPUT (a .zip archive or a directory), then exit.")
+    parser.add_argument("--size", type=float, default=100, metavar="MB",
+                        help="With --generate, total size of the logs (default 100).")
+    parser.add_argument("--vhost-mix", type=parse_vhost_mix, metavar="VHOST=WEIGHT,...",
+                        help="With --generate, vhosts and their share of the traffic.")
+    parser.add_argument("--attack-rate", type=float, default=0.01,
+                        help="With --generate, fraction of lines the rules should catch (default 0.01).")
+    parser.add_argument("--seed", type=int, default=0, help="With --generate, random seed (default 0).")
+    parser.add_argument("--benchmark-pipeline", metavar="ZIP",
+                        help="Time each pipeline stage on the logs in ZIP, in a scratch folder, then exit.")
+    parser.add_argument("--history", help="With --benchmark-pipeline, append the result to this JSON lines file.")
+    parser.add_argument("--rules", default=DEFAULT_RULES_FILE, help="JSON file of suspicious-request rules.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Scan log files in this many processes (default 1).")
+    parser.add_argument("--tail", metavar="LOGS_DIR",
+                        help="Scan only the lines added to the live logs in LOGS_DIR since the last run, "
+                             "add their hits to that directory's matches.txt under log_processing/tail, "
+                             "report request-rate bursts and exit.")
+    parser.add_argument("--ip-ranges",
+                        help="CSV of networks used to tag IPs with owner, country and crawler "
+                             "(default text_files/ip_ranges.csv, skipped if it does not exist).")
+    parser.add_argument("--ip", help="Print what this IP did, from the IP index, and exit.")
+    parser.add_argument("--days", type=int, help="With --ip, only show the last DAYS days before the newest indexed hit.")
+    parser.add_argument("--index", help="SQLite IP index file (default log_processing/logs/ip_index.db).")
+    parser.add_argument("--burst-window", type=int, default=BURST_WINDOW_SECONDS, metavar="SECONDS",
+                        help=f"Sliding window for request-rate bursts (default {BURST_WINDOW_SECONDS}).")
+    for kind, threshold in BURST_THRESHOLDS.items():
+        parser.add_argument(f"--{kind}-burst", type=int, default=threshold, metavar="REQUESTS",
+                            help=f"Requests per window that make a {kind} burst (default {threshold}).")
+    parser.add_argument("--sketch", type=int, metavar="TOP_N",
+                        help="Report the TOP_N IPs, paths and user agents and the distinct IPs per vhost "
+                             "using fixed-memory sketches.")
+    parser.add_argument("--sketch-capacity", type=int, default=DEFAULT_SKETCH_CAPACITY,
+                        help=f"Counters per sketched list; counts are within lines/capacity "
+                             f"(default {DEFAULT_SKETCH_CAPACITY}).")
+    parser.add_argument("--zip-level", type=int, default=DEFAULT_ZIP_LEVEL, choices=range(10), metavar="0-9",
+                        help=f"Compression level for results.zip; 0 stores (default {DEFAULT_ZIP_LEVEL}).")
+    args = parser.parse_args(argv)
+    if args.ip_ranges is not None and not os.path.exists(args.ip_ranges):
+        parser.error(f"--ip-ranges file {args.ip_ranges} does not exist")
 
-def main(script_path):
     # Paths
     root_dir = os.path.dirname(os.path.realpath(script_path))
     log_processing_dir = os.path.join(root_dir, "log_processing")
@@ -60,26 +1441,112 @@ def main(script_path):
     access_logs_zip = os.path.join(text_files_dir, "access_logs.zip")
     results_zip = os.path.join(text_files_dir, "results.zip")
     matches_file = os.path.join(logs_dir, "matches.txt")
+    counts_file = os.path.join(logs_dir, "hit_counts.json")
+    index_file = args.index or os.path.join(logs_dir, "ip_index.db")
+    alerts_file = os.path.join(logs_dir, "rate_alerts.json")
+    sketch_file = os.path.join(logs_dir, "traffic_sketch.json")
+    enriched_file = os.path.join(logs_dir, "matches_enriched.csv")
+
+    if args.benchmark_parser:
+        benchmark_parser(access_logs_zip, args.benchmark_parser)
+        return
+
+    if args.generate:
+        start = time.perf_counter()
+        lines, size = generate_logs(args.generate, args.size, args.vhost_mix, args.attack_rate, args.seed)
+        print(f"Wrote {lines:,} lines ({size / 1e6:,.1f} MB) to {args.generate} in {time.perf_counter() - start:.1f}s")
+        return
+
+    if args.benchmark_pipeline:
+        benchmark_pipeline(args.benchmark_pipeline, workers=args.workers, level=args.zip_level,
+                           history_file=args.history)
+        return
 
     # Create necessary directories
     os.makedirs(log_processing_dir, exist_ok=True)
     # Ensure logs directory is created before processing logs
     os.makedirs(logs_dir, exist_ok=True)
 
-    # Extract ZIP file1
-    extract_zip(access_logs_zip, logs_dir)
+    if args.tail:
+        # Tailed directories keep their own outputs and checkpoints, apart from the batch run's and each other's
+        tail_dir = tail_state_dir(os.path.join(log_processing_dir, "tail"), args.tail)
+        os.makedirs(tail_dir, exist_ok=True)
+        matches_file = os.path.join(tail_dir, "matches.txt")
+        counts_file = os.path.join(tail_dir, "hit_counts.json")
+        checkpoint_file = os.path.join(tail_dir, "checkpoints.json")
+        enriched_file = os.path.join(tail_dir, "matches_enriched.csv")
+        alerts_file = os.path.join(tail_dir, "rate_alerts.json")
+        rate_state_file = os.path.join(tail_dir, "rate_state.json")
+
+    # Only the default table is optional; a missing --ip-ranges file was rejected above
+    if args.ip_ranges is not None:
+        ranges = IpRanges(args.ip_ranges)
+    else:
+        ranges = IpRanges(DEFAULT_IP_RANGES_FILE) if os.path.exists(DEFAULT_IP_RANGES_FILE) else None
+    index = IpIndex(index_file)
+    try:
+        if args.ip:
+            print_ip_activity(index, args.ip, args.days, ranges)
+            return
+
+        # Request rates are counted in the same pass as the rules
+        monitor = RateMonitor(args.burst_window, thresholds={kind: getattr(args, f"{kind}_burst")
+                                                             for kind in BURST_THRESHOLDS})
+        if args.tail:
+            # Live logs are never renamed; the checkpoints remember how far each one was read,
+            # and the saved windows carry bursts across runs
+            load_rate_state(rate_state_file, monitor)
+            closed_before = len(monitor.bursts)
+            process_logs(args.tail, matches_file, load_rules(args.rules), counts_file, args.workers,
+                         checkpoint_file=checkpoint_file, index=index, monitor=monitor)
+            save_rate_state(rate_state_file, monitor)
+            # Only print the bursts still going on or that ended in these lines
+            write_rate_alerts(monitor.report(), alerts_file, monitor.window,
+                              monitor.bursts[closed_before:] + list(monitor.open_bursts.values()))
+        else:
+            # Process logs straight out of the ZIP file
+            process_logs(access_logs_zip, matches_file, load_rules(args.rules), counts_file, args.workers,
+                         index=index, monitor=monitor)
+            write_rate_alerts(monitor.report(), alerts_file, monitor.window)
+    finally:
+        index.close()
+
+    # Tag the matched IPs with who owns them
+    if ranges is not None:
+        crawlers = enrich_matches(matches_file, ranges, enriched_file)
+        print(f"{crawlers} matches come from known crawlers")
+
+    if args.tail:
+        return
+
+    # Sketch the traffic if asked to
+    sketch = TrafficSketch(args.sketch_capacity) if args.sketch else None
+    if sketch is not None:
+        aggregate_traffic(access_logs_zip, sketch)
+        write_traffic_sketch(sketch.report(args.sketch), sketch_file)
+
+    with ResultsArchiver(results_zip, args.zip_level) as archiver:
+        # The scan results are compressed in the background while the logs are extracted
+        archiver.add(matches_file, "matches.txt")
+        archiver.add(counts_file, "hit_counts.json")
+        archiver.add(alerts_file, "rate_alerts.json")
+        if ranges is not None:
+            archiver.add(enriched_file, "matches_enriched.csv")
+        if sketch is not None:
+            archiver.add(sketch_file, "traffic_sketch.json")
 
-    # Process logs
-    process_logs(logs_dir, matches_file)
+        # Extract ZIP file1 for the rename, delete and zip steps
+        extract_zip(access_logs_zip, logs_dir)
 
-    # Rename files
-    rename_files(logs_dir)
+        # Rename files
+        rename_files(logs_dir)
 
-    # Delete unmatched files
-    delete_unmatched(logs_dir)
+        # Delete unmatched files
+        delete_unmatched(logs_dir)
 
-    # Zip log files
-    zip_logs(logs_dir, results_zip)
+        # Zip log files
+        archiver.add_tree(logs_dir)
 
 if __name__ == "__main__":
     main(__file__)
+    test_rule_matcher()
@@ -1,9 +1,40 @@
+import argparse
+import csv
+import html
+import http.client
+import http.server
+import itertools
 import os
+import re
+import string
+import sys
+import threading
 import time
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import urllib.parse
+try:
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+except ImportError:
+    # Only the browser mode needs Selenium; --http runs without it
+    webdriver = None
+
+FORM_FIELDS = ["firstName", "lastName", "emailAddress", "phoneNumber"]
+WEEK_4_DIR = os.path.dirname(os.path.abspath(__file__))
+# Local stand-in of the contact form page, and the values the --http mode tries in it
+STAND_IN_PAGE = os.path.join(WEEK_4_DIR, "stand_in", "index.html")
+CASES_FILE = os.path.join(WEEK_4_DIR, "form_cases.csv")
+# The success message is shown in an element with the alert-success class, as the browser test expects
+SUCCESS_REGEX = re.compile(r'class="[^"]*\balert-success\b')
+# What the stand-in accepts in each field, and the message it shows otherwise
+NAME_REGEX = re.compile(r"[A-Za-z][A-Za-z' -]{0,49}")
+FIELD_RULES = {
+    "firstName": (NAME_REGEX, "Please enter your first name."),
+    "lastName": (NAME_REGEX, "Please enter your last name."),
+    "emailAddress": (re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+"), "Please enter a valid email address."),
+    "phoneNumber": (re.compile(r"\(?\d{3}\)?[-. ]?\d{3}[-. ]?\d{4}"), "Please enter a 10 digit phone number."),
+}
 
 # Function to take a screenshot of the webpage
 def take_screenshot(driver, file_name):
@@ -64,7 +95,114 @@ def validate_form(driver):
         # Adding a delay for refreshing
         time.sleep(5)
 
+# Local stand-in of the contact form: shows the form and checks submitted values like the real page
+class ContactFormHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections open so cases are not slowed by reconnecting
+    disable_nagle_algorithm = True  # Headers and page are written separately; don't hold the page back
+    page = None
+
+    def do_GET(self):
+        self.send_page({field: "" for field in FORM_FIELDS}, "")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        submitted = urllib.parse.parse_qs(body, keep_blank_values=True)
+        values = {field: submitted.get(field, [""])[0] for field in FORM_FIELDS}
+        errors = [field for field in FORM_FIELDS if not FIELD_RULES[field][0].fullmatch(values[field])]
+        if errors:
+            alert = '<div class="alert alert-danger">' + "".join(
+                f'<div class="invalid-feedback" data-field="{field}">{FIELD_RULES[field][1]}</div>'
+                for field in errors) + "</div>"
+        else:
+            alert = '<div class="alert alert-success">Your response has been received. Thank you for submitting!</div>'
+        self.send_page(values, alert)
+
+    def send_page(self, values, alert):
+        page = self.page.substitute(alert=alert, **{field: html.escape(value) for field, value in values.items()})
+        data = page.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # One line per case would drown out the results
+
+# Function to start the stand-in form on a free local port
+def start_stand_in():
+    with open(STAND_IN_PAGE, encoding="utf-8") as page_file:
+        ContactFormHandler.page = string.Template(page_file.read())
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ContactFormHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+# Function to build every combination of the field values in the cases file
+# Each case is the form to submit and the set of fields that should be rejected
+def load_cases(cases_file):
+    values = {field: [] for field in FORM_FIELDS}
+    with open(cases_file, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            values[row["field"]].append((row["value"], row["valid"] == "yes"))
+    cases = []
+    for combination in itertools.product(*(values[field] for field in FORM_FIELDS)):
+        form = {field: value for field, (value, _) in zip(FORM_FIELDS, combination)}
+        invalid = {field for field, (_, valid) in zip(FORM_FIELDS, combination) if not valid}
+        cases.append((form, invalid))
+    return cases
+
+# Function to submit the form over HTTP and read the server's verdict
+# Returns whether it succeeded and which fields it reported as invalid
+def submit_form(connection, path, form):
+    connection.request("POST", path, urllib.parse.urlencode(form),
+                       {"Content-Type": "application/x-www-form-urlencoded"})
+    page = connection.getresponse().read().decode("utf-8", "replace")
+    return SUCCESS_REGEX.search(page) is not None, set(re.findall(r'data-field="(\w+)"', page))
+
+# Function to run every case over one HTTP connection and report those the server got wrong
+def validate_form_http(url, cases):
+    parts = urllib.parse.urlsplit(url)
+    connection_type = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    connection = connection_type(parts.netloc, timeout=10)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    failures = []
+    start = time.perf_counter()
+    for form, invalid in cases:
+        success, rejected = submit_form(connection, path, form)
+        # Servers that do not name the invalid fields are only checked for success or failure
+        if success != (not invalid) or (not success and rejected and rejected != invalid):
+            failures.append((form, invalid, success, rejected))
+    seconds = time.perf_counter() - start
+    connection.close()
+    for form, invalid, success, rejected in failures:
+        expected = f"invalid {sorted(invalid)}" if invalid else "success"
+        got = "success" if success else f"invalid {sorted(rejected)}"
+        print(f"FAILED {form}: expected {expected}, got {got}")
+    print(f"{len(cases) - len(failures)} of {len(cases)} cases passed in {seconds:.2f}s against {url}")
+    return not failures
+
 def main():
+    parser = argparse.ArgumentParser(description="Test the Week 4 contact form.")
+    parser.add_argument("--http", nargs="?", const="", metavar="URL",
+                        help="Submit the form over HTTP without a browser, to URL or to the bundled stand-in.")
+    parser.add_argument("--cases", default=CASES_FILE, help="CSV of field values to combine in --http mode.")
+    args = parser.parse_args()
+
+    if args.http is not None:
+        server = None
+        url = args.http
+        if not url:
+            server, url = start_stand_in()
+        try:
+            passed = validate_form_http(url, load_cases(args.cases))
+        finally:
+            if server:
+                server.shutdown()
+        sys.exit(0 if passed else 1)
+
+    if webdriver is None:
+        sys.exit("Selenium is not installed; use --http to test the form without a browser.")
+
     # Set up Selenium webdriver
     driver = webdriver.Chrome()
     driver.maximize_window()